@@ -0,0 +1,91 @@
+"""Compare the per-tile ASCII conversion against the vectorized summed-area table engine.
+
+The downscaled draft decoding is compared against a full decode as well, it should keep the tile grid.
+
+Usage: python benchmarks/ascii_conversion.py [image ...]
+Without arguments a synthetic photo-sized image is used.
+"""
+import os
+import sys
+import tempfile
+import timeit
+from typing import List
+
+import numpy as np
+import PIL.Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'source'))
+
+from images import Image  # noqa: E402
+
+
+def tiled_ascii(image: Image) -> List[str]:
+    """The original conversion, cropping and averaging every tile on its own."""
+    horizontal, vertical = image.image.size
+    cols = min(image.cols, horizontal, 100)
+    w = horizontal // cols
+    h = int(w / image.scale)
+    rows = min(vertical // h, vertical, 30)
+
+    aimg = []
+    for i in range(rows):
+        aimg.append('')
+        for j in range(cols):
+            tile = image.image.crop((j * w, i * h, (j + 1) * w, (i + 1) * h))
+            avg = int(Image.get_average(tile))
+            scale = image.g_scale(resolution=image.shade['resolution'])
+            aimg[i] += scale[(avg * (image.shade['length'] - 1)) // 255]
+    return aimg
+
+
+def synthetic_image(path: str, width: int = 4000, height: int = 3000) -> None:
+    """Write a noisy gradient image, roughly the size of a camera photo."""
+    gradient = np.linspace(0, 200, width, dtype=np.float64)[np.newaxis, :].repeat(height, axis=0)
+    noise = np.random.default_rng(0).integers(0, 56, size=(height, width))
+    PIL.Image.fromarray((gradient + noise).astype(np.uint8), 'L').save(path)
+
+
+def bench(path: str, number: int = 5) -> None:
+    """Time both conversion paths for every column/resolution setting and check they agree.
+
+    The memoization of `Image.generate_ascii` is bypassed, so every run converts the image again.
+    """
+    for cols in (30, 60, 90):
+        for resolution in (0, 100):
+            image = Image(path, cols, resolution=resolution, draft=False)
+            assert tiled_ascii(image) == image._convert(cols), f'output differs for cols={cols}'
+            tiled = timeit.timeit(lambda: tiled_ascii(image), number=number) / number
+            vectorized = timeit.timeit(lambda: image._convert(cols), number=number) / number
+            print(f'{os.path.basename(path)} cols={cols:<3} resolution={resolution:<3} '
+                  f'tiled {tiled * 1000:8.2f} ms  vectorized {vectorized * 1000:8.2f} ms  '
+                  f'speedup {tiled / vectorized:6.1f}x')
+
+
+def bench_draft(path: str, number: int = 5) -> None:
+    """Time decoding and converting with and without draft mode and check both produce the same tile grid."""
+    for cols in (30, 60, 90):
+        full = Image(path, cols, draft=False)
+        draft = Image(path, cols)
+        expected, lines = full.generate_ascii, draft.generate_ascii
+        assert len(lines) == len(expected), f'rows differ for cols={cols}: {len(lines)} != {len(expected)}'
+        same = sum(a == b for line, other in zip(lines, expected) for a, b in zip(line, other))
+        total = sum(map(len, expected)) or 1
+
+        decoded = timeit.timeit(lambda: Image(path, cols, draft=False).generate_ascii, number=number) / number
+        drafted = timeit.timeit(lambda: Image(path, cols).generate_ascii, number=number) / number
+        print(f'{os.path.basename(path)} cols={cols:<3} draft {"x".join(map(str, draft.image.size)):<9} '
+              f'rows {len(lines)}/{len(expected)}  same chars {same / total:6.1%}  '
+              f'full {decoded * 1000:8.2f} ms  draft {drafted * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        for file in sys.argv[1:]:
+            bench(file)
+            bench_draft(file)
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            file = os.path.join(folder, 'synthetic.png')
+            synthetic_image(file)
+            bench(file)
+            bench_draft(file)
@@ -0,0 +1,54 @@
+"""Measure how many moves per second `Puzzle` handles on large boards.
+
+Compares the tracked empty piece against scanning the whole board for it on every move.
+
+Usage: python benchmarks/puzzle_moves.py [size ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'source'))
+
+from sliding_puzzle import PiecePosition, Puzzle  # noqa: E402
+
+
+class ScanningPuzzle(Puzzle):
+    """Puzzle looking up the empty piece by scanning every piece, as before it was tracked."""
+
+    def _get_empty_piece_position(self) -> PiecePosition:
+        x, y, index = [
+            (x, y, piece.index)
+            for y, row in enumerate(self.rows)
+            for x, piece in enumerate(row)
+            if piece.empty
+        ][0]
+        return PiecePosition(x=x, y=y, index=index)
+
+
+def make_puzzle(cls: type, size: int) -> Puzzle:
+    """Build and shuffle a `size` x `size` puzzle of a synthetic ascii image."""
+    image = [''.join(random.choice('@#+-.') for _ in range(size * 3)) for _ in range(size * 2)]
+    puzzle = cls(image, size, size)
+    puzzle.shuffle()
+    return puzzle
+
+
+def moves_per_second(puzzle: Puzzle, moves: int = 20000) -> float:
+    """Apply random moves and return the achieved rate."""
+    sequence = [random.choice((puzzle.move_up, puzzle.move_down, puzzle.move_left, puzzle.move_right))
+                for _ in range(moves)]
+    start = time.perf_counter()
+    for move in sequence:
+        move()
+    return moves / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    for size in [int(arg) for arg in sys.argv[1:]] or [4, 10, 30]:
+        scanning = moves_per_second(make_puzzle(ScanningPuzzle, size))
+        tracked = moves_per_second(make_puzzle(Puzzle, size))
+        print(f'{size:>3}x{size:<3} scanning {scanning:12,.0f} moves/s  tracked {tracked:12,.0f} moves/s  '
+              f'speedup {tracked / scanning:6.1f}x')
@@ -0,0 +1,40 @@
+"""Compare the bytes written per move when redrawing the whole screen against the differential renderer.
+
+Usage: python benchmarks/render_bytes.py [image]
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'source'))
+
+import main  # noqa: E402
+from blessed.keyboard import Keystroke  # noqa: E402
+from game import Game  # noqa: E402
+from screen import Screen  # noqa: E402
+
+IMAGE = os.path.join(os.path.dirname(__file__), '..', 'resources', 'readme', 'ssj_shuffled.png')
+
+
+def bench(image: str, moves: int = 200) -> None:
+    """Play random moves on every puzzle size and count the bytes each renderer writes."""
+    term = main.Interface(kind='xterm-256color', force_styling=True)
+    keys = [term.KEY_UP, term.KEY_DOWN, term.KEY_LEFT, term.KEY_RIGHT]
+    for columns in (30, 60, 90):
+        for size in (2, 3, 5):
+            game = Game(image, columns, size, size)
+            screen = Screen()
+            screen.update(term, game.render(term))
+            full = diff = 0
+            for _ in range(moves):
+                game.kinput(term, Keystroke(code=random.choice(keys)))
+                frame = game.render(term)
+                full += len((term.clear + term.home + frame + '\n').encode())
+                diff += len(screen.update(term, frame).encode())
+            print(f'{columns} columns {size}x{size}: full {full / moves:8.0f} bytes/move  '
+                  f'differential {diff / moves:8.0f} bytes/move  ratio {full / max(diff, 1):5.1f}x')
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    bench(sys.argv[1] if len(sys.argv) > 1 else IMAGE)
@@ -0,0 +1,64 @@
+"""Measure the startup of the application: the import time of its modules and the time until the first frame.
+
+Every measurement runs in a fresh interpreter, `python -X importtime` reports the cumulative import time of `main`
+and of the heavy modules it should not load before the start screen is shown.
+
+Usage: python benchmarks/startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source')
+HEAVY = ('numpy', 'PIL.Image', 'multiprocessing')
+
+# Renders the start screen the way `Interface.main` does, without waiting for input
+FIRST_FRAME = '''
+import time
+start = time.perf_counter()
+import main
+term = main.Interface(kind='xterm-256color', force_styling=True)
+term.screen.update(term, term.state.render(term))
+print(time.perf_counter() - start)
+print(*[name for name in {heavy} if name in __import__('sys').modules])
+'''
+
+
+def import_times() -> dict:
+    """Cumulative import time in microseconds of `main` and every heavy module loaded by it."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=SOURCE, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.strip() in ('main', *HEAVY):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def first_frame() -> tuple:
+    """Seconds until the start screen is rendered, and the heavy modules loaded by then."""
+    result = subprocess.run([sys.executable, '-c', FIRST_FRAME.format(heavy=HEAVY)],
+                            cwd=SOURCE, capture_output=True, text=True, check=True)
+    seconds, loaded = (result.stdout.splitlines() + [''])[:2]
+    return float(seconds), loaded.split()
+
+
+def bench(runs: int) -> None:
+    """Start the application `runs` times and report the median timings."""
+    imports = [import_times() for _ in range(runs)]
+    frames = [first_frame() for _ in range(runs)]
+
+    print(f'import main      {statistics.median(times["main"] for times in imports) / 1000:8.1f} ms')
+    for name in HEAVY:
+        loaded = [times[name] for times in imports if name in times]
+        print(f'  {name:15}{statistics.median(loaded) / 1000:8.1f} ms' if loaded else f'  {name:15} not loaded')
+    print(f'first frame      {statistics.median(seconds for seconds, _ in frames) * 1000:8.1f} ms')
+    print(f'  loaded by then {", ".join(frames[0][1]) or "none of " + ", ".join(HEAVY)}')
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+
+class AsciiCache:
+    """Persistent cache of converted ASCII art.
+
+    Entries are keyed by the content hash of the image file and the conversion parameters, so the same picture
+    under another path is a hit as well. The content hash of every path is remembered together with its mtime
+    and size, a changed file is hashed again which invalidates its old entries.
+    """
+
+    folder = os.path.dirname(__file__) + '/../resources/cache'
+
+    # Index with the keys 'files' (path -> {'mtime', 'size', 'hash'}) and 'entries' (keys, least recently used first)
+    index: Dict[str, Union[Dict[str, Dict[str, Union[int, str]]], List[str]]]
+
+    def __init__(self, folder: Optional[str] = None, max_entries: int = 128):
+        """Open the cache folder.
+
+        :param folder: Folder to store the cache in, defaults to `resources/cache`
+        :param max_entries: Number of conversions to keep, the least recently used ones are evicted first
+        """
+        if folder is not None:
+            self.folder = folder
+        self.max_entries = max_entries
+        self.index = {'files': {}, 'entries': []}
+        self.__read()
+
+    def get(self, file: str, **params: Union[int, float, str]) -> Optional[List[str]]:
+        """Look up the ASCII art of an image file.
+
+        :param file: The image file path
+        :param params: The conversion parameters the art was generated with
+        :return: The rows of the ASCII art, or None if it is not cached
+        """
+        key = self.__key(file, params)
+        try:
+            with open(self.__entry_path(key)) as entry:
+                content = entry.read()
+        except FileNotFoundError:
+            if key in self.index['entries']:
+                self.index['entries'].remove(key)
+                self.__save()
+            return None
+
+        # mark as most recently used
+        if key in self.index['entries']:
+            self.index['entries'].remove(key)
+        self.index['entries'].append(key)
+        self.__save()
+        return content.split('\n') if content else []
+
+    def put(self, file: str, lines: List[str], **params: Union[int, float, str]) -> None:
+        """Store the ASCII art of an image file.
+
+        :param file: The image file path
+        :param lines: The rows of the ASCII art
+        :param params: The conversion parameters the art was generated with
+        """
+        key = self.__key(file, params)
+        self.__write(self.__entry_path(key), '\n'.join(lines))
+
+        if key in self.index['entries']:
+            self.index['entries'].remove(key)
+        self.index['entries'].append(key)
+
+        # evict the least recently used entries
+        while len(self.index['entries']) > self.max_entries:
+            self.__remove(self.index['entries'].pop(0))
+        self.__prune()
+        self.__save()
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        for key in self.index['entries']:
+            self.__remove(key)
+        self.index = {'files': {}, 'entries': []}
+        self.__save()
+
+    def __key(self, file: str, params: Dict[str, Union[int, float, str]]) -> str:
+        settings = json.dumps(params, sort_keys=True).encode()
+        return self.__file_hash(file) + '-' + hashlib.sha256(settings).hexdigest()[:16]
+
+    def __file_hash(self, file: str) -> str:
+        """Content hash of the file, only read again if its mtime or size changed."""
+        path = os.path.abspath(file)
+        stat = os.stat(path)
+
+        known = self.index['files'].get(path)
+        if known is not None and known['mtime'] == stat.st_mtime_ns and known['size'] == stat.st_size:
+            return known['hash']
+
+        sha = hashlib.sha256()
+        with open(path, mode='rb') as image:
+            for chunk in iter(lambda: image.read(1 << 16), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        if known is not None and known['hash'] != digest:
+            self.__invalidate(path, known['hash'])
+        self.index['files'][path] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'hash': digest}
+        return digest
+
+    def __invalidate(self, path: str, digest: str) -> None:
+        """Drop the entries of an outdated file hash, unless another path still has the same content."""
+        if any(other != path and known['hash'] == digest for other, known in self.index['files'].items()):
+            return
+        for key in [key for key in self.index['entries'] if key.startswith(digest + '-')]:
+            self.index['entries'].remove(key)
+            self.__remove(key)
+
+    def __prune(self) -> None:
+        """Forget the paths none of the remaining entries were converted from, so the index does not keep growing."""
+        live = {key.split('-', 1)[0] for key in self.index['entries']}
+        self.index['files'] = {path: known for path, known in self.index['files'].items() if known['hash'] in live}
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key + '.txt')
+
+    def __remove(self, key: str) -> None:
+        try:
+            os.remove(self.__entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def __write(self, filename: str, content: str) -> None:
+        """Write a file atomically, so an interrupted write never leaves a partial entry behind."""
+        os.makedirs(self.folder, exist_ok=True)
+        temp = f'{filename}.{os.getpid()}.tmp'
+        with open(temp, mode='w') as file:
+            file.write(content)
+        os.replace(temp, filename)
+
+    def __save(self) -> None:
+        self.__write(os.path.join(self.folder, 'index.json'), json.dumps(self.index))
+
+    def __read(self) -> None:
+        try:
+            with open(os.path.join(self.folder, 'index.json')) as file:
+                index = json.load(file)
+            self.index = {'files': dict(index['files']), 'entries': list(index['entries'])}
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass  # missing or corrupt index, start with an empty cache
+
+
+def load_ascii(file: str, cols: int = 80, scale: float = 0.43, resolution: int = 0, draft: bool = True) -> List[str]:
+    """Convert an image file into ASCII art, reusing the cached conversion if available.
+
+    :param file: The image file path
+    :param cols: Number of columns in the ascii image, see `images.Image`
+    :param scale: Adjusted aspect ratio for the ascii image, see `images.Image`
+    :param resolution: Resolution of the character set, see `images.Image`
+    :param draft: Decode a downscaled version of large images, see `images.Image`
+    :return: A list of strings each representing a row of the image.
+    """
+    cache = AsciiCache()
+    params = {'cols': cols, 'scale': scale, 'resolution': resolution, 'draft': draft}
+
+    lines = cache.get(file, **params)
+    if lines is None:
+        # NumPy and PIL are only loaded once an image is converted, see `main.warm_up`
+        from images import Image
+
+        lines = Image(file, cols, scale, resolution, draft=draft).generate_ascii
+        cache.put(file, lines, **params)
+    return lines
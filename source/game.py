@@ -1,40 +1,70 @@
+import os
 import string
+import threading
+from typing import Callable, Dict, List, Optional
 
 from blessed import Terminal as Interface
 from blessed.keyboard import Keystroke
+from cache import load_ascii
 from highscore import Highscore
-from images import Image
 from menus.utils import Menu
-from sliding_puzzle import Puzzle
+from packs import Pack
+from sliding_puzzle import Board, Puzzle
+from solver import Cancelled, Solution, Solver
+
+# Arrow key moving a piece into the empty position, for each move of the empty piece
+HINT_KEYS = {'U': 'down', 'D': 'up', 'L': 'right', 'R': 'left'}
+# Seconds to search for an optimal solution, the search runs in the background
+SOLVER_TIMEOUT = 30.0
+# Seconds to search for an optimal solution when looking for a hint, before settling for a suboptimal one
+HINT_TIMEOUT = 2.0
 
 
 class Game(Menu):
     """Game menu where the user is playing."""
 
-    def __init__(self, image: str, columns: int, horizontal: int, vertical: int):
+    def __init__(self, image: str, columns: int, horizontal: int, vertical: int, pack: Optional[Pack] = None,
+                 lines: Optional[List[str]] = None):
         """Init function
 
-        :param image: Image path
+        :param image: Image path, or the name of the entry if `pack` is given
         :param columns: Image width
         :param horizontal: Number of horizontal puzzle pieces
         :param vertical: Number of vertical puzzle pieces
+        :param pack: Puzzle pack to take the converted image from, instead of converting the image file
+        :param lines: The image converted to `columns` already, for example for the preview, it is not changed
         """
         self.selected = 0
         self.player_name = ''
 
         self.path = image
-        self.image = Image(image, columns)
-
-        self.puzzle = Puzzle(self.image.generate_ascii, horizontal, vertical)
+        if pack is not None:
+            # highscores of pack entries are kept as if the pack was a folder
+            self.path = os.path.join(os.path.abspath(pack.filename), image)
+        if lines is None:
+            lines = pack.lines(pack.find(image), columns) if pack is not None else load_ascii(image, columns)
+        self.puzzle = Puzzle(lines, horizontal, vertical)
         self.puzzle.shuffle()
+        self.start_board = self.puzzle.board
+
+        self.hint = ''
+        self.hint_board: Optional[Board] = None  # the board a hint is searched for
+        self.optimal: Optional[Solution] = None
+        self.searching = False  # whether the optimal solution is still searched for
+        self.search: Optional[threading.Event] = None  # cancels the search for the optimal solution
+        self.hint_search: Optional[threading.Event] = None  # cancels the search for a hint
+        self.shown_time = 0  # elapsed time in the last render
+        self.solved_in_background = False  # whether a search finished since the last render
 
     def render(self, term: Interface) -> str:
         """Render the game-menu."""
         # displayed content regardless of 'selected'
         rendered = term.move_y(3)  # just a spacing
 
+        self.shown_time = self.puzzle.time_needed
+        self.solved_in_background = False
         rendered += term.center(
-            f'Moves: {self.puzzle.moves_done}' + term.move_right(4) + f'Time {self.puzzle.time_needed}'
+            f'Moves: {self.puzzle.moves_done}' + term.move_right(4) + f'Time {self.shown_time}'
         )
         rendered += term.move_down(1)
 
@@ -48,6 +78,7 @@ class Game(Menu):
         if self.selected == 0:  # puzzle is active
             rendered += term.center('Use the arrow keys to move the pieces')
             rendered += term.center('Hit TAB to select "Exit"')
+            rendered += term.center(self.hint or 'Hit H for a hint')
             rendered += term.move_xy(4, term.height - 3) + 'Exit'
         elif self.selected == 1:  # Exit button is selected
             rendered += term.center('Hit Enter to leave the puzzle')
@@ -55,6 +86,12 @@ class Game(Menu):
             rendered += term.move_xy(4, term.height - 3) + term.black_on_white('Exit')
         elif self.selected == 2:  # puzzle is solved
             rendered += term.center(term.green_on_black('Congratulations, you completed the puzzle'))
+            if self.searching:
+                rendered += term.center('Searching for the shortest solution...')
+            elif self.optimal is not None:
+                rendered += term.center(
+                    f'{"Optimal" if self.optimal.optimal else "Shortest found"} solution: {len(self.optimal)} moves'
+                )
             rendered += term.center('Please put in your name for the highscore (letters only): ' + self.player_name)
 
         return rendered
@@ -62,20 +99,15 @@ class Game(Menu):
     def kinput(self, term: Interface, key: Keystroke) -> None:
         """Handle keyboard input (what button is selected)."""
         if self.selected == 0:  # input for puzzle mode
-            if key.code == term.KEY_UP:
-                self.puzzle.move_down()
-            elif key.code == term.KEY_RIGHT:
-                self.puzzle.move_left()
-            elif key.code == term.KEY_DOWN:
-                self.puzzle.move_up()
-            elif key.code == term.KEY_LEFT:
-                self.puzzle.move_right()
+            moves = self.__arrow_moves(term)
+            if key.lower() == 'h':
+                self.__request_hint()
+                return
+            self.__clear_hint()
+            if key.code in moves:
+                self.__move(moves[key.code])
             elif key.code == term.KEY_TAB:
                 self.selected = 1
-
-            if self.puzzle.solved:  # Check if puzzle is solve, which also updates time elapsed
-                # TODO: implement timeout for key input (time will only update, if key is hit)
-                self.selected = 2
         elif self.selected == 1:  # input when 'Exit' is selected
             if key.code == term.KEY_TAB:
                 self.selected = 0
@@ -86,13 +118,104 @@ class Game(Menu):
             elif key.code in (term.KEY_BACKSPACE, term.KEY_DELETE):
                 self.player_name = self.player_name[:-1]
 
+    def kinput_batch(self, term: Interface, keys: List[Keystroke]) -> None:
+        """Handle all keys typed since the last render, applying runs of arrow keys to the puzzle at once."""
+        arrows = self.__arrow_moves(term)
+        moves = ''
+        for key in keys:
+            if self.selected == 0 and key.code in arrows:
+                moves += arrows[key.code]
+                continue
+            self.__move(moves)
+            moves = ''
+            self.kinput(term, key)
+        self.__move(moves)
+
+    def tick(self, term: Interface) -> bool:
+        """Render again when the elapsed time changed or a search finished, the screen only updates where needed."""
+        return self.puzzle.time_needed != self.shown_time or self.solved_in_background
+
+    @staticmethod
+    def __arrow_moves(term: Interface) -> Dict[int, str]:
+        """Move of the empty piece for each arrow key, the arrows move the piece next to it."""
+        return {term.KEY_UP: 'D', term.KEY_RIGHT: 'L', term.KEY_DOWN: 'U', term.KEY_LEFT: 'R'}
+
+    def __move(self, moves: str) -> None:
+        if not moves or self.selected != 0:
+            return
+        self.__clear_hint()
+        self.puzzle.apply_moves(moves, strict=False)
+        if self.puzzle.solved:
+            self.selected = 2
+            self.searching = True
+            self.search = self.__solve(self.start_board, SOLVER_TIMEOUT, self.__show_optimal)
+
+    def __solve(self, board: Board, timeout: float, done: Callable[[Optional[Solution]], None]) -> threading.Event:
+        """Solve a board in a background thread, the game stays responsive while searching.
+
+        :return: Event cancelling the search, `done` is not called for a cancelled search
+        """
+        cancel = threading.Event()
+
+        def search() -> None:
+            try:
+                solution = Solver(timeout=timeout, cancel=cancel).solve(board)
+            except Cancelled:
+                return
+            except ValueError:
+                solution = None  # the puzzle was shuffled into an unsolvable state
+            done(solution)
+            self.solved_in_background = True
+
+        threading.Thread(target=search, daemon=True).start()
+        return cancel
+
+    def __show_optimal(self, solution: Optional[Solution]) -> None:
+        self.optimal = solution
+        self.searching = False
+
+    def __request_hint(self) -> None:
+        board = self.puzzle.board
+        if board == self.hint_board:
+            return  # the hint is shown or searched for already
+        self.hint_board = board
+        self.hint = 'Looking for a hint...'
+        self.hint_search = self.__solve(board, HINT_TIMEOUT, lambda solution: self.__show_hint(board, solution))
+
+    def __show_hint(self, board: Board, solution: Optional[Solution]) -> None:
+        if board is not self.hint_board:
+            return  # the pieces were moved in the meantime
+        if solution is None:
+            self.hint = 'This puzzle can not be solved, sorry'
+        elif solution.moves:
+            self.hint = f'Hint: press the {HINT_KEYS[solution.moves[0]]} arrow key'
+        else:
+            self.hint = ''
+
+    def __clear_hint(self) -> None:
+        if self.hint_search is not None:
+            self.hint_search.set()
+            self.hint_search = None
+        self.hint = ''
+        self.hint_board = None
+
+    def __stop_searching(self) -> None:
+        """Cancel the searches still running, their results would not be shown anymore."""
+        self.__clear_hint()
+        if self.search is not None:
+            self.search.set()
+            self.search = None
+
     def click(self, term: Interface) -> Menu:
         """Handle a enter-press."""
         if self.selected == 1:
+            self.__stop_searching()
             from menus.start import StartMenu
             return StartMenu()
         elif self.selected == 2:
-            Highscore().add(self.path, self.player_name, self.puzzle.moves_done, self.puzzle.time_needed)
+            self.__stop_searching()
+            Highscore.shared().add(self.path, self.player_name,
+                                   time=self.puzzle.time_needed, moves=self.puzzle.moves_done)
             from menus.highscore_menu import HighScoreMenu  # Circular imports
             return HighScoreMenu()
         else:
@@ -1,54 +1,238 @@
+import heapq
+import math
 import os
-from operator import itemgetter
-from typing import Dict, List, Union
+import sqlite3
+from bisect import bisect_right, insort
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from table import make_table
 
+# Keys to sort the highscore by, 'Score' combines the time and the moves needed
+SORT_KEYS = ('Time', 'Moves', 'Score')
+
+# Seconds to wait for other processes writing to the database
+LOCK_TIMEOUT = 10.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    puzzle TEXT NOT NULL,
+    name TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    moves INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- The leaderboards are kept in memory, databases created before kept them up to date on every insert as well
+DROP TRIGGER IF EXISTS update_best;
+DROP TABLE IF EXISTS best;
+DROP INDEX IF EXISTS scores_by_time;
+DROP INDEX IF EXISTS scores_by_moves;
+DROP INDEX IF EXISTS scores_by_score;
+'''
+
 
 class Highscore:
-    """Highscore Class"""
+    """Highscore Class
+
+    The highscores are stored in a SQLite database, in the order they were added. Highscores of the CSV file used
+    before are imported once when the database is created.
+
+    All highscores are kept in memory as well, in leaderboards sorted by time, moves and score for every puzzle. They
+    are updated with every added highscore and only reloaded when another process changed the database. Use `shared`
+    to get the instance shared by all menus.
+    """
+
+    filename = os.path.dirname(__file__) + '/../resources/highscore.db'
+    csv_filename = os.path.dirname(__file__) + '/../resources/highscore.csv'
+
+    # Leaderboards of every puzzle for each sort key, as sorted lists of (value, id, entry)
+    boards: Dict[str, Dict[str, List[Tuple[int, int, Dict[str, Union[str, int]]]]]]
+
+    __shared: Optional['Highscore'] = None
+
+    def __init__(self, filename: Optional[str] = None, csv_filename: Optional[str] = None):
+        """Open the highscore database, creating it if needed
+
+        :param filename: Database file, defaults to `resources/highscore.db`
+        :param csv_filename: CSV file to import the highscores from, defaults to `resources/highscore.csv`
+        """
+        if filename is not None:
+            self.filename = filename
+        if csv_filename is not None:
+            self.csv_filename = csv_filename
 
-    filename = os.path.dirname(__file__) + '/../resources/highscore.csv'
+        # other processes hold the lock only for a single transaction, wait for it instead of failing
+        self.connection = sqlite3.connect(self.filename, timeout=LOCK_TIMEOUT)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+        self.__migrate()
 
-    # List of Dictionary entries with following keys: 'Puzzle', 'Name', 'Time', 'Moves'
-    highscore: List[Dict[str, Union[str, int]]]
+        self.boards = {}
+        self.__entries = []
+        self.__pending = []
+        self.__batches = 0
+        self.mtime = None
+        self.__load()
 
-    def __init__(self):
-        self.highscore = []
-        self.__read()
+    @classmethod
+    def shared(cls) -> 'Highscore':
+        """Get the highscores of the default database, opened only once per process
+
+        :return: The shared instance, reloaded if the database was changed by another process
+        """
+        if cls.__shared is None:
+            cls.__shared = cls()
+        else:
+            cls.__shared.refresh()
+        return cls.__shared
+
+    @property
+    def highscore(self) -> List[Dict[str, Union[str, int]]]:
+        """All highscores in the order they were added, as dictionaries with the keys Puzzle, Name, Time and Moves"""
+        return list(self.__entries)
+
+    def refresh(self) -> None:
+        """Reload the highscores if the database file was modified since they were loaded"""
+        if self.__mtime() != self.mtime:
+            self.__load()
 
     def add(self, image: str, player_name: str, time: int, moves: int) -> None:
         """Adds new highscore to the list
 
+        Inside of `batch` the highscore is only written when the batch ends.
+
         :param image: Name of the image for which to store the highscore
         :param player_name: Name of the player for whom to add a highscore
         :param time: Time (in seconds) used by the player so solve the puzzle
         :param moves: Moves needed by the player to solve the puzzle
         """
-        self.highscore.append({'Puzzle': image, 'Name': player_name, 'Time': time, 'Moves': moves})
-        self.__save_entry()
+        self.__pending.append({'Puzzle': image, 'Name': player_name, 'Time': time, 'Moves': moves})
+        if self.__batches == 0:
+            self.flush()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collect the highscores added in this context and write them in a single transaction at its end
+
+        The highscores are written even if the context is left with an exception. Batches can be nested, the outermost
+        one writes the highscores.
+        """
+        self.__batches += 1
+        try:
+            yield
+        finally:
+            self.__batches -= 1
+            if self.__batches == 0:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write all added highscores which are not written yet"""
+        if not self.__pending:
+            return
+
+        with self.connection:
+            # lock the database before looking for changes, so no other process can write in between
+            self.connection.execute('BEGIN IMMEDIATE')
+            up_to_date = self.__mtime() == self.mtime
+            ids = [self.connection.execute('INSERT INTO scores (puzzle, name, time, moves) VALUES (?, ?, ?, ?)',
+                                           (entry['Puzzle'], entry['Name'], entry['Time'], entry['Moves'])).lastrowid
+                   for entry in self.__pending]
+
+        if up_to_date:
+            for id_, entry in zip(ids, self.__pending):
+                self.__insert(id_, entry)
+            self.mtime = self.__mtime()
+        else:
+            self.__load()  # pick up the highscores added by other processes as well
+        self.__pending = []
+
+    def compact(self) -> None:
+        """Rebuild the database file without the space left by deleted highscores
+
+        SQLite rebuilds the file through its journal, an interrupted compaction leaves the database unchanged.
+        """
+        self.flush()
+        self.connection.execute('VACUUM')
+        self.mtime = self.__mtime()
+
+    def top(self, puzzle: str, count: Optional[int] = 10, page: int = 0,
+            sort: Union[str, Callable[[Dict[str, Union[str, int]]], Any]] = 'Time',
+            distinct: bool = True) -> List[Dict[str, Union[str, int]]]:
+        """Get the best highscores of a puzzle, one page at a time
+
+        :param puzzle: Name of the puzzle for which to get the highscores
+        :param count: Number of highscores per page, all highscores if None
+        :param page: Page to get, starting at 0
+        :param sort: Sort the highscores after Time, Moves or Score (time and moves added up), which are read from the
+               sorted leaderboards, or after the values returned by a function of the entry. Default is Time.
+        :param distinct: Skip entries with the same name, time and moves as a better one
+        :return: The highscores on the page, best first and in the order they were added if equally good
+        """
+        boards = self.boards.get(puzzle)
+        if boards is None:
+            return []
+        start = page * count if count is not None else 0
+        stop = start + count if count is not None else None
+
+        if not callable(sort):
+            # the leaderboard is sorted already, stop reading it once the page is filled
+            board = self.__distinct(boards[sort]) if distinct else boards[sort]
+            return [entry for _, _, entry in islice(board, start, stop)]
+
+        # a custom order is only sorted up to the requested page
+        candidates = self.__distinct(boards['Time']) if distinct else boards['Time']
+
+        def key(item: Tuple[int, int, Dict[str, Union[str, int]]]) -> Tuple[Any, int]:
+            return sort(item[2]), item[1]
+
+        ranked = sorted(candidates, key=key) if stop is None else heapq.nsmallest(stop, candidates, key=key)
+        return [entry for _, _, entry in ranked[start:]]
+
+    def best(self, puzzle: str, sort: str = 'Time') -> Optional[Dict[str, Union[str, int]]]:
+        """Get the first highscore with the best time, moves or score of a puzzle
+
+        :param puzzle: Name of the puzzle for which to get the best highscore
+        :param sort: Time, Moves or Score (time and moves added up). Default is Time.
+        :return: The best highscore, or None if there is no highscore for this puzzle
+        """
+        if puzzle not in self.boards:
+            return None
+        return self.boards[puzzle][sort][0][2]
 
-    def display(self, puzzle: str, sort: str = 'Time') -> str:
+    def leaders(self) -> Dict[str, Dict[str, Union[str, int]]]:
+        """Get the entry with the best score of every puzzle
+
+        :return: Dictionary of the puzzles and their leading highscore, which has the additional key 'Shared' with the
+                 number of entries sharing the best score
+        """
+        leaders = {}
+        for puzzle, boards in self.boards.items():
+            board = boards['Score']
+            score, _, entry = board[0]
+            leaders[puzzle] = dict(entry, Shared=bisect_right(board, (score, math.inf)))
+        return leaders
+
+    def display(self, puzzle: str, sort: str = 'Time', count: Optional[int] = None, page: int = 0) -> str:
         """Display the player highscore
 
         :param puzzle: Name of the puzzle for which to show the highscore
         :param sort: Sort the highscore after Time or Moves. Default is Time.
+        :param count: Number of highscores to show, all if None, see `top`
+        :param page: Page of highscores to show, see `top`
         :return: Returns the highscore as a table
         """
-        # get highscores for requested puzzle
-        highscore = []
-        for entry in self.highscore:
-            if entry['Puzzle'] == puzzle:
-                highscore.append(entry)
+        highscore = self.top(puzzle, count=count, page=page, sort=sort, distinct=False)
         if len(highscore) == 0:
             return 'No highscore for this puzzle available.'
 
-        # sort the highscore
-        if sort == 'Time':
-            highscore = sorted(highscore, key=itemgetter('Time'))
-        elif sort == 'Moves':
-            highscore = sorted(highscore, key=itemgetter('Moves'))
-
         table = make_table(
             rows=[[entry['Puzzle'], entry['Name'], entry['Time'], entry['Moves']] for entry in highscore],
             labels=['Puzzle', 'Name', 'Time', 'Moves'])
@@ -57,26 +241,72 @@ class Highscore:
 
     def delete(self) -> None:
         """Deletes all highscores"""
-        self.highscore.clear()
-        os.remove(self.filename)  # file will be created again when saving new data
+        with self.connection:
+            self.connection.execute('DELETE FROM scores')
+        self.boards = {}
+        self.__pending = []
+        self.__entries = []
+        self.mtime = self.__mtime()
+
+    def close(self) -> None:
+        """Write the remaining highscores and close the database"""
+        self.flush()
+        self.connection.close()
+
+    def __load(self) -> None:
+        self.mtime = self.__mtime()
+        self.boards = {}
+        self.__entries = []
+        for row in self.connection.execute('SELECT * FROM scores ORDER BY id'):
+            self.__insert(row['id'], self.__entry(row))
 
-    def __save_entry(self) -> None:
+    def __insert(self, id_: int, entry: Dict[str, Union[str, int]]) -> None:
+        """Add an entry to the leaderboards of its puzzle, keeping them sorted"""
+        self.__entries.append(entry)
+        boards = self.boards.setdefault(entry['Puzzle'], {sort: [] for sort in SORT_KEYS})
+        insort(boards['Time'], (entry['Time'], id_, entry))
+        insort(boards['Moves'], (entry['Moves'], id_, entry))
+        insort(boards['Score'], (entry['Time'] + entry['Moves'], id_, entry))
+
+    @staticmethod
+    def __distinct(board: List[Tuple[int, int, Dict[str, Union[str, int]]]]) \
+            -> Iterator[Tuple[int, int, Dict[str, Union[str, int]]]]:
+        """Skip the items of a leaderboard repeating an entry seen before"""
+        seen = set()
+        for item in board:
+            key = (item[2]['Name'], item[2]['Time'], item[2]['Moves'])
+            if key not in seen:
+                seen.add(key)
+                yield item
+
+    def __mtime(self) -> Optional[int]:
         try:
-            with open(self.filename, mode='a') as file:
-                values = list(dict(self.highscore[-1]).values())
-                values = [str(value) for value in values]
-                file.write(','.join(values) + '\n')
+            return os.stat(self.filename).st_mtime_ns
         except FileNotFoundError:
-            pass  # TODO: error handling
+            return None  # in-memory database
 
-    def __read(self) -> None:
-        try:
-            with open(self.filename) as file:
-                lines = file.readlines()
-                for line in lines:
-                    entry = line.strip().split(',')
-                    self.highscore.append({'Puzzle': entry[0], 'Name': entry[1],
-                                           'Time': int(entry[2]), 'Moves': int(entry[3])})
+    @staticmethod
+    def __entry(row: sqlite3.Row) -> Dict[str, Union[str, int]]:
+        return {'Puzzle': row['puzzle'], 'Name': row['name'], 'Time': row['time'], 'Moves': row['moves']}
 
-        except FileNotFoundError:
-            pass  # TODO: error handling
+    def __migrate(self) -> None:
+        """Import the highscores of the CSV file, only the first time the database is opened"""
+        with self.connection:
+            # claiming the migration first locks the database, so concurrent processes import the file only once
+            claimed = self.connection.execute("INSERT OR IGNORE INTO meta VALUES ('migrated', ?)",
+                                              (self.csv_filename,))
+            if claimed.rowcount == 0:
+                return
+
+            entries = []
+            try:
+                with open(self.csv_filename) as file:
+                    for line in file:
+                        entry = line.strip().split(',')
+                        if len(entry) != 4 or not entry[2].isdigit() or not entry[3].isdigit():
+                            continue  # skip empty and malformed lines
+                        entries.append((entry[0], entry[1], int(entry[2]), int(entry[3])))
+            except FileNotFoundError:
+                pass  # nothing to import
+
+            self.connection.executemany('INSERT INTO scores (puzzle, name, time, moves) VALUES (?, ?, ?, ?)', entries)
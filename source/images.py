@@ -1,8 +1,62 @@
-from typing import List
+from typing import Dict, Iterable, List, Tuple
 
 import numpy as np
 import PIL.Image
 
+# Upper bounds of the ascii image size
+MAX_COLS = 100
+MAX_ROWS = 30
+# Minimum number of pixels per tile column that is kept when decoding a downscaled image
+TILE_PIXELS = 8
+
+
+def decode(image: PIL.Image.Image, draft: bool = True) -> PIL.Image.Image:
+    """Decode an opened image into greyscale, downscaled close to the largest possible tile grid if `draft` is set.
+
+    JPEG images are scaled down while decoding (DCT scaling), other formats are reduced by an integer factor
+    after decoding. At least `TILE_PIXELS` pixels per tile of a `MAX_COLS` wide ascii image are kept, the tile
+    grid itself is laid out at full resolution, see `Image._convert`.
+    """
+    target = MAX_COLS * TILE_PIXELS
+    if draft and image.format == 'JPEG':
+        image.draft('L', (target, 1))
+    image = image.convert('L')
+
+    factor = image.width // target
+    if draft and factor > 1:
+        image = image.reduce(factor)
+    return image
+
+
+def integral_image(pixels: np.ndarray) -> np.ndarray:
+    """Sum up a greyscale pixel array into a summed-area table, padded with a leading row and column of zeros.
+
+    The sum of any tile grid can be read off the table, so ascii images of every size share it.
+    """
+    integral = np.zeros((pixels.shape[0] + 1, pixels.shape[1] + 1), dtype=np.int64)
+    np.cumsum(pixels, axis=0, dtype=np.int64, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral
+
+
+def integral_average(integral: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """Average the luminance of every tile of a greyscale image using its summed-area table.
+
+    :param integral: Summed-area table of the pixels, see `integral_image`
+    :param ys: The rows + 1 pixel rows the tile rows start and end at, in ascending order
+    :param xs: The cols + 1 pixel columns the tile columns start and end at, in ascending order
+    :return: A (rows, cols) array with the truncated average luminance of each tile
+    """
+    corners = integral[np.ix_(ys, xs)]
+    sums = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+    return (sums / np.outer(np.diff(ys), np.diff(xs))).astype(np.uint8)
+
+
+def shade_table(shades: str) -> np.ndarray:
+    """Build a lookup table mapping every luminance value (0-255) to its ASCII character."""
+    length = len(shades)
+    return np.array([shades[(value * (length - 1)) // 255] for value in range(256)])
+
 
 class Image:
     """Class taking care of image conversion and processing."""
@@ -14,7 +68,8 @@ class Image:
         scale: float = 0.43,
         resolution: int = 0,
         shade_str: str = "$@B%8&WM#*oahkbdpqwmZO0QLCJUYXzcvunxrjft/\\()1{}[]?-_+~<>i!lI;:,\"^`'.",
-        shade_min: str = "@#+-."
+        shade_min: str = "@#+-.",
+        draft: bool = True
     ):
         """Convert an image file into ASCII art.
 
@@ -27,9 +82,20 @@ class Image:
                shade_min
         :param shade_str: defaults to a well known pattern of 69 characters used to define the greyscale
         :param shade_min: defaults to a minimalistic pattern of 5 characters used to define the greyscale
+        :param draft: decode a downscaled version of large images, which is faster and uses less memory,
+               defaults to True
         """
         self.file = file
-        self.image = PIL.Image.open(file).convert("L")
+        self.draft = draft
+        # Only the header is read here, the pixels are decoded on first access of `image`
+        self._source = PIL.Image.open(file)
+        # Full resolution size, JPEG draft mode changes the size of the source
+        self.size = self._source.size
+        self._image = None
+        # Summed-area table of the decoded pixels, shared by the conversions to all sizes
+        self._integral = None
+        # Converted ascii images, keyed by the settings they were generated with
+        self._ascii: Dict[Tuple[int, float, int, str, str], List[str]] = {}
         if not (cols and scale):
             raise ValueError("Columns and Scale value can not be 0")
         else:
@@ -45,11 +111,18 @@ class Image:
         }
 
     def __repr__(self) -> str:
-        return f'<Image file={self.file} image={self.image}>'
+        return f'<Image file={self.file} image={self._image or self._source}>'
 
     def __str__(self) -> str:
         return '\n'.join(self.generate_ascii)
 
+    @property
+    def image(self) -> PIL.Image.Image:
+        """The greyscale image, decoded on first access."""
+        if self._image is None:
+            self._image = decode(self._source, self.draft)
+        return self._image
+
     def g_scale(self, resolution: int = 0) -> str:
         """
         Helper function to determine the character set based on the resolution
@@ -79,35 +152,50 @@ class Image:
         """
         Convert the opened image into ASCII art
 
+        The result is only computed again if `cols`, `scale`, the resolution or the shade strings changed.
+
         :return: A list of strings each representing a row of the image.
         """
-        horizontal, vertical = self.image.size
-        self.cols = min(self.cols, horizontal, 100)  # clamps the number of cols
+        return self.ascii_sizes([self.cols])[self.cols]
+
+    def ascii_sizes(self, cols: Iterable[int]) -> Dict[int, List[str]]:
+        """
+        Convert the opened image into ASCII art of several widths, sharing the decoded pixels
+
+        :param cols: The numbers of columns to generate the ascii images for
+        :return: A dictionary mapping each number of columns to the list of rows of that ascii image.
+        """
+        sizes = {}
+        for width in cols:
+            key = (width, self.scale, self.shade["resolution"], self.shade["str"], self.shade["min"])
+            if key not in self._ascii:
+                self._ascii[key] = self._convert(width)
+            # Callers like `Puzzle` modify the list, so hand out a copy
+            sizes[width] = list(self._ascii[key])
+        return sizes
+
+    def _convert(self, cols: int) -> List[str]:
+        # lay out the tiles at full resolution, so a downscaled image is cropped the same way as the original
+        horizontal, vertical = self.size
+        cols = min(cols, horizontal, MAX_COLS)  # clamps the number of cols
         # compute tile dimensions based on aspect ratio and scale
-        w = horizontal // self.cols
+        w = horizontal // cols
         h = int(w / self.scale)
         rows = vertical // h
-        rows = min(rows, vertical, 30)  # clamps the number of rows
-
-        aimg = []
-        # generate list of dimensions
-        for i in range(rows):
-            y1 = i * h
-            y2 = (i + 1) * h
-            aimg.append("")
-
-            for j in range(self.cols):
-                # crop image to tile
-                x1 = int(j * w)
-                x2 = int((j + 1) * w)
-
-                # crop image to extract tile
-                img = self.image.crop((x1, y1, x2, y2))
-                # get average luminance
-                avg = int(self.get_average(img))
-                # look up ascii char
-                scale = self.g_scale(resolution=self.shade["resolution"])
-                # append ascii char to string
-                aimg[i] += scale[(avg * (self.shade["length"] - 1)) // 255]
-
-        return aimg
+        rows = min(rows, vertical, MAX_ROWS)  # clamps the number of rows
+
+        if rows == 0:
+            return []
+
+        if self._integral is None:
+            self._integral = integral_image(np.asarray(self.image))
+
+        # look up ascii chars for the average luminance of all tiles at once
+        table = shade_table(self.g_scale(resolution=self.shade["resolution"]))
+        width, height = self.image.size
+        ys = np.rint(np.arange(rows + 1) * h * height / vertical).astype(np.intp)
+        xs = np.rint(np.arange(cols + 1) * w * width / horizontal).astype(np.intp)
+        chars = table[integral_average(self._integral, ys, xs)]
+
+        # view every row of single characters as one string
+        return chars.view(f'<U{cols}').ravel().tolist()
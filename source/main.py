@@ -1,7 +1,14 @@
+import threading
+from typing import List
+
 import menus
 from blessed import Terminal
 from blessed.keyboard import Keystroke
 from menus.utils import Menu
+from screen import Screen
+
+# Seconds to wait for input before checking whether the menu changed on its own, like a running clock
+TICK = 0.2
 
 
 class Interface(Terminal):
@@ -11,23 +18,50 @@ class Interface(Terminal):
         super().__init__(*args, **kwargs)
 
         self.state: Menu = menus.StartMenu()
+        self.screen = Screen()
 
     def render(self) -> None:
-        """Clear and render the screen depending on the current state."""
-        print(self.clear + self.home + self.state.render(self))
+        """Render the screen depending on the current state, only writing what changed since the last frame."""
+        print(self.screen.update(self, self.state.render(self)), end='', flush=True)
 
-    def kinput(self, key: Keystroke) -> None:
-        """Propogate keyboard input."""
-        if key.code == self.KEY_ENTER:
-            self.state = self.state.click(self)
-        else:
-            self.selected = self.state.kinput(self, key)
+    def kinput(self, keys: List[Keystroke]) -> None:
+        """Propogate keyboard input, handing all keys between ENTER presses to the menu at once."""
+        batch = []
+        for key in keys:
+            if key.code == self.KEY_ENTER:
+                if batch:
+                    self.state.kinput_batch(self, batch)
+                    batch = []
+                self.state = self.state.click(self)
+            else:
+                batch.append(key)
+        if batch:
+            self.state.kinput_batch(self, batch)
 
     def main(self) -> None:
         """Start the main function taking care of the complete lifetime of the program."""
+        self.render()
+        threading.Thread(target=warm_up, daemon=True).start()
         while True:
-            self.render()
-            self.kinput(self.inkey())
+            key = self.inkey(timeout=TICK)
+            if key:
+                # handle everything typed in the meantime before rendering only once
+                keys = []
+                while key:
+                    keys.append(key)
+                    key = self.inkey(timeout=0)
+                self.kinput(keys)
+                self.render()
+            elif self.state.tick(self):
+                self.render()
+
+
+def warm_up() -> None:
+    """Import the image conversion, which loads NumPy and PIL, so the first game or preview does not wait for it.
+
+    Runs in a background thread once the start screen is shown, the menus only import it when converting an image.
+    """
+    import images  # noqa: F401
 
 
 if __name__ == '__main__':
@@ -1,12 +1,16 @@
 import os
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 import PIL
 from blessed import Terminal as Interface
 from blessed.keyboard import Keystroke
+from packs import PACK_EXTENSION
+from previews import PREVIEW_COLUMNS, Preview, Previews
+from scanner import DirectoryScan
 
+from .choose_pack import ChoosePackEntry
 from .puzzle_setting import PuzzleSetting
-from .utils import Menu, PopupMessage
+from .utils import Menu, PopupMessage, ScrollList, set_string_length
 
 if TYPE_CHECKING:
     # Interface is a subclass of Terminal, importing it directly would cause circular imports
@@ -19,65 +23,115 @@ class ChooseFile(Menu):
     """Menu showing a file explorer for the user to navigate and pick a file."""
 
     def __init__(self) -> None:
-        self.selected = 0
-
+        self.scan = None
+        self.previews = Previews.shared()
+        self.shown_preview = None
         self.init_files(os.getcwd())
 
     def init_files(self, folder: str) -> None:
-        """List and save all files in the specified folder."""
-        self.selected = 0  # Reset the selected item
+        """Start listing the folders and supported files in the specified folder."""
         self.current_dir = folder
 
+        if self.scan is not None:
+            self.scan.cancel()
+        self.scan = DirectoryScan(self.current_dir, SUPPORTED_FILE_TYPES + (PACK_EXTENSION,))
+        self.shown_version = None
+
         self.dirs = ['../']  # Initialize with parent folder
         self.files = []
-        for item in os.listdir(self.current_dir):
-            if os.path.isdir(os.path.join(self.current_dir, item)):
-                self.dirs.append(item + '/')
-
-            else:
-                self.files.append(item)
+        # Directories always come first, the selection starts at the top again
+        self.items = ScrollList(self.dirs, reserved_lines=2)
+        self.__update()
 
     def render(self, term: Interface) -> str:
         """Render the file explorer."""
+        status = self.current_dir
+        if self.scan.error is not None:
+            status += f' ({self.scan.error.strerror})'
+        elif not self.scan.done.is_set():
+            status += ' (scanning...)'
+
         rendered = [
             # Make sure we don't go over the terminal width
-            term.black_on_white(self.current_dir.ljust(term.width)[-term.width:]) + '\n'
+            term.black_on_white(status.ljust(term.width)[-term.width:]) + '\n'
         ]
 
-        for i, item in enumerate(self.dirs):
-            line = (' ' * 4 + item).ljust(term.width)
+        # show the preview next to the list if both fit
+        pane = PREVIEW_COLUMNS + 4
+        width = term.width - pane if term.width >= 2 * pane else term.width
 
-            rendered.append(term.black_on_blue(line) if self.selected == i else term.blue(line))
+        for i, item in self.items.visible(term):
+            line = set_string_length(' ' * 4 + item, width)
 
-        for i, item in enumerate(self.files):
-            line = (' ' * 4 + item).ljust(term.width)
-
-            rendered.append(term.black_on_white(line) if self.selected == (i + len(self.dirs)) else line)
+            if i < len(self.dirs):
+                rendered.append(term.black_on_blue(line) if self.items.selected == i else term.blue(line))
+            else:
+                rendered.append(term.black_on_white(line) if self.items.selected == i else line)
+
+        preview = self.shown_preview = self.__preview()
+        if width < term.width and self.items.selected >= len(self.dirs):
+            if self.__pack_selected():
+                lines = ['Puzzle pack', 'Press enter to choose an image']
+            elif preview is None:
+                lines = ['Loading preview...']
+            elif isinstance(preview, BaseException):
+                lines = ['No preview available']
+            else:
+                lines = preview
+            for y, line in enumerate(lines[:max(0, term.height - 3)]):
+                rendered.append(term.move_yx(2 + y, width + 2) + line[:PREVIEW_COLUMNS])
 
         return '\n'.join(rendered)
 
     def kinput(self, term: Interface, key: Keystroke) -> None:
         """Handle keyboard input for changing which button is selected."""
-        if key.code == term.KEY_UP:
-            self.selected -= 1
-        elif key.code == term.KEY_DOWN:
-            self.selected += 1
-
-        self.selected = max(0, min(self.selected, len(self.dirs) + len(self.files) - 1))
+        self.items.kinput(term, key)
+
+    def tick(self, term: Interface) -> bool:
+        """Show the entries found by the directory scan and the finished preview since the last render."""
+        changed = self.__update()
+        return self.__preview() is not self.shown_preview or changed
+
+    def __preview(self) -> Optional[Preview]:
+        """Get the preview of the selected file, None while it is converted or if a folder or pack is selected."""
+        if self.items.selected < len(self.dirs) or self.__pack_selected():
+            self.previews.cancel()
+            return None
+        return self.previews.request(os.path.join(self.current_dir, self.items.item))
+
+    def __pack_selected(self) -> bool:
+        return self.items.selected >= len(self.dirs) and self.items.item.lower().endswith(PACK_EXTENSION)
+
+    def __update(self) -> bool:
+        """Take over the entries found so far, returns whether anything changed."""
+        version = (self.scan.version, self.scan.done.is_set())
+        if version == self.shown_version:
+            return False
+        self.shown_version = version
+
+        self.dirs = ['../', *self.scan.dirs]
+        self.files = list(self.scan.files)
+        self.items.replace(self.dirs + self.files)
+        return True
 
     def click(self, term: Interface) -> Menu:
         """Handle a enter press, updating currently viewed files or changing state."""
-        if self.selected < len(self.dirs):  # If it is a folder that is selected (they always come first)
-            self.init_files(os.path.abspath(os.path.join(self.current_dir, self.dirs[self.selected])))
+        if self.items.selected < len(self.dirs):  # If it is a folder that is selected (they always come first)
+            self.init_files(os.path.abspath(os.path.join(self.current_dir, self.items.item)))
             return self  # Don't change state
 
-        filename = self.files[self.selected - len(self.dirs)]
+        filename = self.items.item
+        if self.__pack_selected():
+            try:
+                return ChoosePackEntry(self, os.path.abspath(os.path.join(self.current_dir, filename)))
+            except (OSError, ValueError):
+                return PopupMessage(self, f'Attempted to open {filename}, but it is not a puzzle pack', term.red)
+        if isinstance(self.__preview(), OSError):
+            # The preview could not be decoded, the image would not load either
+            return PopupMessage(self, f'Attempted to open {filename}, but did not recognize an image', term.red)
         try:
             return PuzzleSetting(
-                os.path.abspath(
-                    # The subtraction is to accomodate for directories being selected
-                    os.path.join(self.current_dir, filename)
-                )
+                os.path.abspath(os.path.join(self.current_dir, filename))
             )
         except PIL.UnidentifiedImageError:
             # Invalid image
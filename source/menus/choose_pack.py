@@ -0,0 +1,75 @@
+from typing import TYPE_CHECKING, List
+
+from blessed import Terminal as Interface
+from blessed.keyboard import Keystroke
+from packs import Pack
+from previews import PREVIEW_COLUMNS
+
+from .puzzle_setting import PuzzleSetting
+from .utils import Menu, PopupMessage, ScrollList, set_string_length
+
+if TYPE_CHECKING:
+    # Interface is a subclass of Terminal, importing it directly would cause circular imports
+    from ..main import Interface  # noqa: F811
+
+
+class ChoosePackEntry(Menu):
+    """Menu listing the images of a puzzle pack for the user to pick one, like a folder in the file explorer."""
+
+    def __init__(self, origin: Menu, filename: str) -> None:
+        """Open a puzzle pack
+
+        :param origin: The menu to go back to
+        :param filename: The pack file, raises an OSError or ValueError if it can not be read
+        """
+        self.origin = origin
+        self.pack = Pack(filename)
+        self.names = [self.pack.name(entry) for entry in range(len(self.pack))]
+        self.items = ScrollList(['../', *self.names], reserved_lines=2)
+
+    def render(self, term: Interface) -> str:
+        """Render the images of the pack."""
+        status = f'{self.pack.filename} ({len(self.names)} images)'
+        rendered = [term.black_on_white(status.ljust(term.width)[-term.width:]) + '\n']
+
+        # show the preview next to the list if both fit
+        pane = PREVIEW_COLUMNS + 4
+        width = term.width - pane if term.width >= 2 * pane else term.width
+
+        for i, item in self.items.visible(term):
+            line = set_string_length(' ' * 4 + item, width)
+            if i == 0:
+                rendered.append(term.black_on_blue(line) if self.items.selected == i else term.blue(line))
+            else:
+                rendered.append(term.black_on_white(line) if self.items.selected == i else line)
+
+        if width < term.width and self.items.selected > 0:
+            for y, line in enumerate(self.__preview()[:max(0, term.height - 3)]):
+                rendered.append(term.move_yx(2 + y, width + 2) + line[:PREVIEW_COLUMNS])
+
+        return '\n'.join(rendered)
+
+    def kinput(self, term: Interface, key: Keystroke) -> None:
+        """Handle keyboard input for changing which image is selected."""
+        self.items.kinput(term, key)
+
+    def click(self, term: Interface) -> Menu:
+        """Go back to the file explorer, or pick the settings for the selected image."""
+        if self.items.selected == 0:
+            self.pack.close()
+            return self.origin
+        try:
+            return PuzzleSetting(self.items.item, pack=self.pack)
+        except ValueError:
+            # The art of the entry is cut short
+            return PopupMessage(self, f'Attempted to open {self.items.item}, but the puzzle pack is damaged', term.red)
+
+    def __preview(self) -> List[str]:
+        """The selected image at the smallest size of the pack, the art is converted already."""
+        cols = min(self.pack.columns, default=None)
+        if cols is None:
+            return ['No preview available']
+        try:
+            return self.pack.lines(self.items.selected - 1, cols)
+        except ValueError:
+            return ['The puzzle pack is damaged']
@@ -6,7 +6,7 @@ from highscore import Highscore
 
 from .choose_file import ChooseFile
 from .highscore_submenu import HighScoreSubMenu
-from .utils import Menu, set_string_length
+from .utils import Menu, ScrollList, set_string_length
 
 if TYPE_CHECKING:
     # Interface is a subclass of Terminal, importing it directly would cause circular imports
@@ -17,25 +17,21 @@ class HighScoreMenu(Menu):
     """The highscore menu."""
 
     def __init__(self):
-        self.selected = 0
-
-        self.highscores = Highscore().highscore
-        self.puzzles = {}
-        for hs in self.highscores:
-            hs['Puzzle'] = hs['Puzzle'].split('/')[-1]
-            if not hs['Puzzle'] in self.puzzles:
-                self.puzzles[hs['Puzzle']] = hs
-            else:
-                puzzle = self.puzzles[hs['Puzzle']]
-                if hs['Moves'] + hs['Time'] < puzzle['Moves'] + puzzle['Time']:
-                    self.puzzles[hs['Puzzle']] = hs
-                if hs['Moves'] + hs['Time'] == puzzle['Moves'] + puzzle['Time']:
-                    self.puzzles[hs['Puzzle']] = {
-                        'Puzzle': hs['Puzzle'],
-                        'Name': 'Shared 1st place',
-                        'Time': 0,
-                        'Moves': 0
-                    }
+        # the leader of every puzzle, puzzles with the same file name are listed once
+        puzzles = {}
+        for path, leader in Highscore.shared().leaders().items():
+            name = path.split('/')[-1]
+            puzzle = puzzles.get(name)
+            if puzzle is None or leader['Moves'] + leader['Time'] < puzzle['Moves'] + puzzle['Time']:
+                puzzles[name] = dict(leader, Puzzle=name, Path=path)
+            elif leader['Moves'] + leader['Time'] == puzzle['Moves'] + puzzle['Time']:
+                puzzle['Shared'] += leader['Shared']
+        for puzzle in puzzles.values():
+            if puzzle['Shared'] > 1:
+                puzzle['Name'] = 'Shared 1st place'
+
+        # None stands for the 'From files' button below the list
+        self.puzzles = ScrollList([*puzzles.values(), None], reserved_lines=5)
 
     def render(self, term: Interface) -> str:
         """Render the highscore table and a button to add new highscore."""
@@ -47,10 +43,11 @@ class HighScoreMenu(Menu):
             + '    ' + '\n'
         )
 
-        for i, puzzle in enumerate(self.puzzles):
-            puzzle = self.puzzles[puzzle]
+        for i, puzzle in self.puzzles.visible(term):
+            if puzzle is None:
+                continue
             rendered.append(
-                (term.black_on_white if self.selected == i else str)(
+                (term.black_on_white if self.puzzles.selected == i else str)(
                     '    '
                     + set_string_length(puzzle['Puzzle'], term.width - 40)
                     + set_string_length(puzzle['Name'], 32)
@@ -60,29 +57,18 @@ class HighScoreMenu(Menu):
 
         rendered.append(
             term.move_yx(term.height - 3, 4)
-            + (term.black_on_white('From files') if self.selected == len(self.puzzles) else 'From files')
+            + (term.black_on_white('From files') if self.puzzles.item is None else 'From files')
         )
 
         return '\n'.join(rendered)
 
     def click(self, term: Interface) -> Menu:
         """Handle enter key presses, changing state to file_explorer if the Add new button is selected."""
-        if self.selected != len(self.puzzles):
-            selected_puzzle_name: str
-            for i, item in enumerate(self.puzzles):
-                if i == self.selected:
-                    selected_puzzle_name = item
-
-            return HighScoreSubMenu(selected_puzzle_name)
+        if self.puzzles.item is not None:
+            return HighScoreSubMenu(self.puzzles.item['Path'])
 
         return ChooseFile()
 
     def kinput(self, term: Interface, key: Keystroke) -> None:
         """Handle arrow key input, changing the selected button."""
-        if key.code == term.KEY_UP:
-            self.selected -= 1
-        elif key.code == term.KEY_DOWN:
-            self.selected += 1
-
-        # Clamp the value
-        self.selected = max(0, min(self.selected, len(self.puzzles)))
+        self.puzzles.kinput(term, key)
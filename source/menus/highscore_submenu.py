@@ -17,20 +17,14 @@ class HighScoreSubMenu(Menu):
     def __init__(self, puzzle: str) -> None:
         self.selected = 0
         self.puzzle = puzzle
-        self.highscores = []
-        highscores = Highscore().highscore
-
-        for hs in highscores:
-            if hs['Puzzle'] == self.puzzle and hs not in self.highscores:
-                self.highscores.append(hs)
-
-        self.highscores.sort(key=lambda x: x['Moves'] + x['Time'])
 
     def render(self, term: Interface) -> str:
         """Render the highscores."""
         rendered = []
         rendered.append(term.move_down(1))
-        for i, highscore in enumerate(self.highscores):
+        # only the highscores fitting above the prompt
+        highscores = Highscore.shared().top(self.puzzle, count=max(0, term.height - 5), sort='Score')
+        for i, highscore in enumerate(highscores):
             color = term.webgrey
             if i == 0:
                 color = term.color_rgb(215, 190, 105)
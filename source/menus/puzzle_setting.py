@@ -1,20 +1,49 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
 from blessed import Terminal as Interface
 from blessed.keyboard import Keystroke
 from game import Game
-from menus.utils import Menu
+from menus.utils import Menu, PopupMessage
+from packs import PUZZLE_COLUMNS, Pack
+from sliding_puzzle import Puzzle
 
 
 class PuzzleSetting(Menu):
     """Menu to choose the settings for the puzzle"""
 
-    def __init__(self, image: str):
+    def __init__(self, image: str, pack: Optional[Pack] = None):
+        """Initialize the settings for an image
+
+        :param image: Image path, or the name of the entry if `pack` is given
+        :param pack: Puzzle pack to take the converted image from, instead of converting the image file
+        """
         self.image = image
+        self.pack = pack
         self.selected = 0
         self.columns = 30
         self.rows = int(self.columns ** 0.43)
         self.horizontal = 2
         self.vertical = 2
 
+        self.sizes: Optional[Dict[int, List[str]]] = None
+        self.error: Optional[Exception] = None
+        self.frames: Dict[Tuple[int, int, int], List[str]] = {}
+        self.preview_shown = False
+
+        if pack is not None:
+            # the art of every size is in the pack already
+            entry = pack.find(image)
+            self.sizes = {cols: pack.lines(entry, cols) for cols in PUZZLE_COLUMNS if cols in pack.columns}
+            return
+
+        # NumPy and PIL are only loaded once an image is converted, see `main.warm_up`
+        from images import Image
+
+        # Opening the image only reads its header, the previews of all sizes are converted in the background
+        self.ascii = Image(image)
+        threading.Thread(target=self.__convert, daemon=True).start()
+
     def render(self, term: Interface) -> str:
         """Renders the puzzle settings menu"""
         rendered = term.move_y(1)
@@ -22,20 +51,20 @@ class PuzzleSetting(Menu):
         if self.selected in range(7):
             rendered += term.center('Pick the size the puzzle should have')
             rendered += self.__puzzle_size(term)
-            # TODO: make it work
-            # rendered += term.move_y(3)
-            # rendered += term.center('┌' + '─' * (self.columns - 2) + '┐')
-            # for _ in range(self.rows):
-            #     rendered += term.center('│' + term.move_right(self.columns - 2) + '│')
-            # rendered += term.center('└' + '─' * (self.columns - 2) + '┘')
+            rendered += self.__preview(term)
         elif self.selected in range(10, 17, 1):
             rendered += term.center('Pick the number of puzzle pieces')
             rendered += self.__puzzle_pieces(term)
+            rendered += self.__preview(term)
         else:
             rendered += term.center(f'Number of selected is: {self.selected}')
 
         return rendered
 
+    def tick(self, term: Interface) -> bool:
+        """Render again once the previews are converted."""
+        return (self.sizes is not None or self.error is not None) != self.preview_shown
+
     def kinput(self, term: Interface, key: Keystroke) -> None:
         """Handles the inputs in the puzzle settings menu"""
         if key.code == term.KEY_LEFT:
@@ -96,7 +125,11 @@ class PuzzleSetting(Menu):
             self.selected = 10
             return self
         elif self.selected >= 10:
-            return Game(self.image, self.columns, self.horizontal, self.vertical)
+            if self.pack is not None and self.columns not in self.pack.columns:
+                return PopupMessage(self, f'The puzzle pack has no images with {self.columns} columns', term.red)
+            # reuse the art of the preview, it is only converted again if the preview is not done yet
+            lines = self.sizes.get(self.columns) if self.sizes is not None else None
+            return Game(self.image, self.columns, self.horizontal, self.vertical, pack=self.pack, lines=lines)
         else:
             return self
 
@@ -146,3 +179,34 @@ class PuzzleSetting(Menu):
                 ' 2x2 ' + ' 3x2 ' + ' 3x3 ' + ' 4x3 ' + ' 4x4 ' + ' 5x4 ' + term.black_on_white(' 5x5 '))
 
         return rendered
+
+    def __convert(self) -> None:
+        try:
+            self.sizes = self.ascii.ascii_sizes(PUZZLE_COLUMNS)
+        except Exception as error:  # PIL only finds broken image data when decoding it
+            self.error = error
+
+    def __preview(self, term: Interface) -> str:
+        """The image at the selected size, split into the selected pieces, below the settings."""
+        self.preview_shown = self.sizes is not None or self.error is not None
+        if self.error is not None:
+            return term.move_y(4) + term.center(term.red('The image could not be loaded'))
+        elif self.sizes is None:
+            return term.move_y(4) + term.center('Loading preview...')
+
+        elif self.columns not in self.sizes:
+            return term.move_y(4) + term.center(term.red('The puzzle pack has no images of this size'))
+
+        # the frames are only drawn once, switching between settings looks them up
+        key = (self.columns, self.horizontal, self.vertical)
+        if key not in self.frames:
+            try:
+                puzzle = Puzzle(self.sizes[self.columns], self.horizontal, self.vertical)
+                self.frames[key] = puzzle.draw(term).split('\n')
+            except (ValueError, IndexError, ZeroDivisionError):
+                self.frames[key] = []  # the image is too small to be split
+        frame = self.frames[key][:max(0, term.height - 5)]
+        if frame and len(frame[0]) > term.width:
+            return term.move_y(4) + term.center(term.red('The puzzle is too wide for this terminal'))
+
+        return term.move_y(4) + ''.join(term.center(line) for line in frame)
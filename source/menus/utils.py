@@ -1,5 +1,8 @@
 import math
-from typing import TYPE_CHECKING, Callable, Protocol
+from typing import (
+    TYPE_CHECKING, Callable, Generic, Iterator, List, Protocol, Sequence,
+    Tuple, TypeVar
+)
 
 from blessed import Terminal as Interface
 from blessed.keyboard import Keystroke
@@ -8,6 +11,8 @@ if TYPE_CHECKING:
     # Interface is a subclass of Terminal, importing it directly would cause circular imports
     from ..main import Interface  # noqa: F811
 
+T = TypeVar('T')
+
 
 class Menu(Protocol):
     """Menu protocol that all menus implement."""
@@ -24,10 +29,19 @@ class Menu(Protocol):
         """Handle any keyboard input however the menu see fit.."""
         ...
 
+    def kinput_batch(self, term: Interface, keys: List[Keystroke]) -> None:
+        """Handle all keys typed since the last render, by default one after another."""
+        for key in keys:
+            self.kinput(term, key)
+
     def click(self, term: Interface) -> 'Menu':  # Forward reference
         """Handle ENTER presses, this method should return a menu instance."""
         ...
 
+    def tick(self, term: Interface) -> bool:
+        """Handle time passing without input, this method should return whether the menu has to be rendered again."""
+        return False
+
 
 class PopupMessage(Menu):
     """Popup message class"""
@@ -61,6 +75,71 @@ class PopupMessage(Menu):
         return self.origin
 
 
+class ScrollList(Generic[T]):
+    """A list of items scrolling with the selected one, only the items fitting on the screen are rendered."""
+
+    def __init__(self, items: Sequence[T], reserved_lines: int = 0) -> None:
+        """Initialize the list
+
+        :param items: The items to choose from
+        :param reserved_lines: Number of terminal lines used by the rest of the menu
+        """
+        self.items = items
+        self.reserved_lines = reserved_lines
+        self.selected = 0
+        self.top = 0  # index of the first visible item
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def item(self) -> T:
+        """The selected item."""
+        return self.items[self.selected]
+
+    def replace(self, items: Sequence[T]) -> None:
+        """Replace the items, the selected item stays selected if it is still in the list."""
+        item = self.items[self.selected] if self.items else None
+        self.items = items
+        if self.selected >= len(items) or items[self.selected] != item:
+            self.selected = items.index(item) if item in items else 0
+
+    def height(self, term: Interface) -> int:
+        """Number of items fitting on the screen."""
+        return max(1, term.height - self.reserved_lines)
+
+    def visible(self, term: Interface) -> Iterator[Tuple[int, T]]:
+        """Get the index and item of each visible item, scrolling the list so the selected item is visible."""
+        height = self.height(term)
+        if self.selected < self.top:
+            self.top = self.selected
+        elif self.selected >= self.top + height:
+            self.top = self.selected - height + 1
+        self.top = max(0, min(self.top, len(self.items) - height))
+
+        for i in range(self.top, min(self.top + height, len(self.items))):
+            yield i, self.items[i]
+
+    def kinput(self, term: Interface, key: Keystroke) -> None:
+        """Handle the arrow, page up/down, home and end keys, changing the selected item."""
+        height = self.height(term)
+        if key.code == term.KEY_UP:
+            self.selected -= 1
+        elif key.code == term.KEY_DOWN:
+            self.selected += 1
+        elif key.code == term.KEY_PGUP:
+            self.selected -= height
+        elif key.code == term.KEY_PGDOWN:
+            self.selected += height
+        elif key.code == term.KEY_HOME:
+            self.selected = 0
+        elif key.code == term.KEY_END:
+            self.selected = len(self.items) - 1
+
+        # Clamp the value
+        self.selected = max(0, min(self.selected, len(self.items) - 1))
+
+
 def set_string_length(string: str, length: int) -> str:
     """Padd- or cut off - the string to make sure it is `length` long"""
     if len(string) == length:
@@ -0,0 +1,268 @@
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Number of columns of the puzzle sizes to choose from
+PUZZLE_COLUMNS = (30, 40, 50, 60, 70, 80, 90)
+
+# File name ending of puzzle packs, the file explorer lists them next to the images
+PACK_EXTENSION = '.pack'
+
+# Puzzle packs, collections of images converted into ASCII art ahead of time.
+#
+# A pack file is laid out as follows, all numbers little-endian:
+#
+# - Header: magic `b'SCJPACK\0'`, format version (u16), number of column settings S (u16), number of entries N (u32),
+#   scale (f32) and resolution (u16) the images were converted with
+# - Column settings: S times the requested number of columns (u16)
+# - Index: N fixed-size records, each with the offset (u64) and length (u16) of the entry name, followed by the offset
+#   (u64), number of rows (u16) and number of columns (u16) of the art at each column setting
+# - Names: the UTF-8 encoded names of all entries, their paths relative to the converted folder
+# - Art: the rows of each converted image, `rows * columns` ASCII bytes without line endings
+#
+# All offsets are absolute, so any entry can be located in constant time without reading the rest of the file.
+MAGIC = b'SCJPACK\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIfH')
+COLUMN = struct.Struct('<H')
+NAME = struct.Struct('<QH')
+ART = struct.Struct('<QHH')
+
+# Converted entry: its name and the rows of the art at each column setting
+Entry = Tuple[str, Dict[int, List[str]]]
+
+
+def index_record(settings: int) -> struct.Struct:
+    """The layout of an index record of a pack with the given number of column settings."""
+    return struct.Struct('<' + NAME.format[1:] + ART.format[1:] * settings)
+
+
+class Pack:
+    """A puzzle pack, read through a memory map.
+
+    Opening a pack only reads its header, the index and art of an entry are only paged in when it is accessed.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """Open a pack file
+
+        :param filename: The pack file, raises a ValueError if it is no puzzle pack or is cut short
+        """
+        self.filename = filename
+        with open(filename, mode='rb') as file:
+            # the map stays valid after the file is closed
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        try:
+            self.__read_header()
+        except ValueError:
+            self.close()
+            raise
+        self.names: Optional[Dict[str, int]] = None
+
+    def __read_header(self) -> None:
+        if len(self.map) < HEADER.size:
+            raise ValueError(f'{self.filename} is not a puzzle pack')
+        magic, version, settings, self.entries, self.scale, self.resolution = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f'{self.filename} is not a puzzle pack')
+        if version != VERSION:
+            raise ValueError(f'{self.filename} has the unsupported pack version {version}')
+
+        self.record = index_record(settings)
+        self.index = HEADER.size + COLUMN.size * settings
+        # the index has a fixed size, names and art are checked when they are accessed
+        self.__check(HEADER.size, self.index - HEADER.size + self.record.size * self.entries)
+        self.columns = struct.unpack_from(f'<{settings}{COLUMN.format[1:]}', self.map, HEADER.size)
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def __enter__(self) -> 'Pack':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def name(self, entry: int) -> str:
+        """Get the name of an entry, its path relative to the converted folder."""
+        offset, length = NAME.unpack_from(self.map, self.__record(entry))
+        self.__check(offset, length)
+        return str(self.view[offset:offset + length], 'utf-8')
+
+    def find(self, name: str) -> int:
+        """Get the number of the entry with the given name, raises a KeyError if there is none."""
+        if self.names is None:
+            self.names = {self.name(entry): entry for entry in range(self.entries)}
+        return self.names[name]
+
+    def art(self, entry: int, cols: int) -> Tuple[memoryview, int, int]:
+        """Get the raw art of an entry without copying it
+
+        :param entry: The number of the entry
+        :param cols: The column setting, one of `columns`
+        :return: A view of the ASCII bytes of all rows, the number of rows and the number of columns of each row
+        """
+        if cols not in self.columns:
+            raise ValueError(f'{self.filename} has no art with {cols} columns, only with {self.columns}')
+        position = self.__record(entry) + NAME.size + ART.size * self.columns.index(cols)
+        offset, rows, width = ART.unpack_from(self.map, position)
+        self.__check(offset, rows * width)
+        return self.view[offset:offset + rows * width], rows, width
+
+    def lines(self, entry: int, cols: int) -> List[str]:
+        """Get the art of an entry
+
+        :param entry: The number of the entry
+        :param cols: The column setting, one of `columns`
+        :return: A list of strings each representing a row of the image, like `images.Image.generate_ascii`
+        """
+        art, rows, width = self.art(entry, cols)
+        return [str(art[row * width:(row + 1) * width], 'ascii') for row in range(rows)]
+
+    def close(self) -> None:
+        """Close the pack, all views returned by `art` have to be released first."""
+        self.view.release()
+        self.map.close()
+
+    def __check(self, offset: int, length: int) -> None:
+        """Make sure a part of the pack lies within the file, raises a ValueError if the file is cut short."""
+        if offset + length > len(self.map):
+            raise ValueError(f'{self.filename} is truncated')
+
+    def __record(self, entry: int) -> int:
+        if not 0 <= entry < self.entries:
+            raise IndexError(f'{self.filename} has no entry {entry}')
+        return self.index + self.record.size * entry
+
+
+def write_pack(filename: str, entries: Iterable[Entry], columns: Sequence[int] = PUZZLE_COLUMNS, scale: float = 0.43,
+               resolution: int = 0) -> int:
+    """Write converted images into a pack file
+
+    The art is streamed into a temporary file first, only the index is kept in memory. The pack replaces `filename`
+    atomically once it is complete.
+
+    :param filename: The pack file to write
+    :param entries: The names of the images and their art at every column setting
+    :param columns: The column settings the images were converted with
+    :param scale: The scale the images were converted with, see `images.Image`
+    :param resolution: The resolution the images were converted with, see `images.Image`
+    :return: The number of entries written
+    """
+    names = []
+    arts = []
+    folder = os.path.dirname(os.path.abspath(filename))
+    with tempfile.TemporaryFile(dir=folder) as data:
+        for name, sizes in entries:
+            art = []
+            for cols in columns:
+                lines = sizes.get(cols, [])
+                width = len(lines[0]) if lines else 0
+                if any(len(line) != width for line in lines):
+                    raise ValueError(f'The art of {name} is not a complete rectangle')
+                art.append((data.tell(), len(lines), width))
+                data.write(''.join(lines).encode('ascii'))
+            names.append(name.encode())
+            arts.append(art)
+
+        record = index_record(len(columns))
+        start = HEADER.size + COLUMN.size * len(columns) + record.size * len(names)
+        art_start = start + sum(len(name) for name in names)
+
+        temp = f'{filename}.{os.getpid()}.tmp'
+        with open(temp, mode='wb') as pack:
+            pack.write(HEADER.pack(MAGIC, VERSION, len(columns), len(names), scale, resolution))
+            pack.write(b''.join(COLUMN.pack(cols) for cols in columns))
+
+            offset = start
+            for name, art in zip(names, arts):
+                values = [offset, len(name)]
+                for position, rows, width in art:
+                    values.extend((art_start + position, rows, width))
+                pack.write(record.pack(*values))
+                offset += len(name)
+            pack.write(b''.join(names))
+
+            data.seek(0)
+            shutil.copyfileobj(data, pack)
+        os.replace(temp, filename)
+    return len(names)
+
+
+def find_images(folder: str) -> Iterator[str]:
+    """Find all supported image files in a directory tree, in a stable order."""
+    from menus.choose_file import SUPPORTED_FILE_TYPES  # Circular imports
+
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith(SUPPORTED_FILE_TYPES):
+                yield os.path.join(root, file)
+
+
+def convert(task: Tuple[str, str, Tuple[int, ...], float, int]) -> Tuple[str, Optional[Dict[int, List[str]]], str]:
+    """Convert one image at every column setting, runs in the worker processes.
+
+    :param task: The folder, the image file, the column settings, scale and resolution
+    :return: The name of the entry, its art or None if the image could not be converted, and the error message
+    """
+    from images import Image  # Reading packs needs neither PIL nor NumPy
+
+    folder, file, columns, scale, resolution = task
+    name = os.path.relpath(file, folder)
+    try:
+        return name, Image(file, scale=scale, resolution=resolution).ascii_sizes(columns), ''
+    except Exception as error:  # PIL raises many different errors for broken files
+        return name, None, str(error) or type(error).__name__
+
+
+def convert_folder(folder: str, filename: str, columns: Sequence[int] = PUZZLE_COLUMNS, scale: float = 0.43,
+                   resolution: int = 0, processes: Optional[int] = None) -> int:
+    """Convert all images of a directory tree into a pack, using a process on every core
+
+    :param folder: The directory tree to convert
+    :param filename: The pack file to write
+    :param columns: The column settings to convert every image at
+    :param scale: Adjusted aspect ratio of the ascii images, see `images.Image`
+    :param resolution: Resolution of the character set, see `images.Image`
+    :param processes: Number of worker processes, defaults to the number of cores
+    :return: The number of images written to the pack
+    """
+    # the game reads packs as well, it does not need multiprocessing
+    import multiprocessing
+
+    tasks = [(folder, file, tuple(columns), scale, resolution) for file in find_images(folder)]
+    processes = processes or os.cpu_count() or 1
+
+    def converted(results: Iterable[Tuple[str, Optional[Dict[int, List[str]]], str]]) -> Iterator[Entry]:
+        for name, sizes, error in results:
+            if sizes is None:
+                print(f'Skipped {name}: {error}')
+            else:
+                yield name, sizes
+
+    with multiprocessing.Pool(processes) as pool:
+        # results arrive in order, so the pack is the same no matter how the work is split
+        results = pool.imap(convert, tasks, chunksize=max(1, len(tasks) // (processes * 8)))
+        return write_pack(filename, converted(results), columns, scale, resolution)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert a directory tree of images into a puzzle pack.')
+    parser.add_argument('folder', help='directory tree with the images to convert')
+    parser.add_argument('pack', help='pack file to write')
+    parser.add_argument('--columns', type=int, nargs='+', default=PUZZLE_COLUMNS, help='column settings to convert at')
+    parser.add_argument('--scale', type=float, default=0.43, help='adjusted aspect ratio of the ascii images')
+    parser.add_argument('--resolution', type=int, default=0, help='resolution of the character set, 0 to 100')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, defaults to all cores')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = convert_folder(args.folder, args.pack, args.columns, args.scale, args.resolution, args.processes)
+    print(f'Converted {count} images into {args.pack} in {time.perf_counter() - start:.1f} seconds')
@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Number of columns of a preview
+PREVIEW_COLUMNS = 30
+
+# Number of previews to keep
+CACHE_SIZE = 256
+
+# Number of times a conversion is retried when it failed for other reasons than the file, like a crashed worker
+RETRIES = 1
+
+# A preview, the OSError raised when the file could not be decoded, or the exception of the last failed retry
+Preview = Union[List[str], BaseException]
+
+
+def render_preview(file: str, cols: int) -> List[str]:
+    """Convert an image file into a small ASCII preview, runs in the worker processes."""
+    # NumPy and PIL are only loaded by the workers
+    from images import Image
+
+    return Image(file, cols).generate_ascii
+
+
+class Previews:
+    """ASCII previews of image files, converted in a process pool.
+
+    Previews are cached by path and modification time. Requesting a preview cancels the conversions of all others
+    which did not start yet, so only the preview currently looked at is waited for. Files which can not be decoded
+    are cached as well, conversions failing for other reasons, like a worker running out of memory and breaking the
+    pool, are retried with a new pool instead.
+    """
+
+    __shared: Optional['Previews'] = None
+
+    def __init__(self, cols: int = PREVIEW_COLUMNS, workers: int = 2) -> None:
+        """Initialize the previews, the worker processes are started with the first request
+
+        :param cols: Number of columns of the previews
+        :param workers: Number of worker processes
+        """
+        self.cols = cols
+        self.workers = workers
+        self.executor: Optional['ProcessPoolExecutor'] = None
+
+        self.lock = threading.RLock()
+        self.cache: 'OrderedDict[Tuple[str, int], Preview]' = OrderedDict()
+        self.pending: Dict[Tuple[str, int], Future] = {}
+        # conversions which failed for other reasons than the file, with the number of failures and the last error
+        self.failed: Dict[Tuple[str, int], Tuple[int, BaseException]] = {}
+
+    @classmethod
+    def shared(cls) -> 'Previews':
+        """Get the previews shared by all menus."""
+        if cls.__shared is None:
+            cls.__shared = cls()
+        return cls.__shared
+
+    def request(self, file: str) -> Optional[Preview]:
+        """Get the preview of an image file, starting its conversion if needed
+
+        :param file: The image file path
+        :return: The preview, the OSError raised decoding the file, the error of the conversion if it failed for
+                 other reasons even when retried, or None while the conversion is running
+        """
+        try:
+            key = (file, os.stat(file).st_mtime_ns)
+        except OSError as error:
+            return error
+
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            failures, error = self.failed.get(key, (0, None))
+            if failures > RETRIES:
+                return error
+
+            # nobody is waiting for the other previews anymore
+            for other in [other for other in self.pending if other != key]:
+                if self.pending[other].cancel():
+                    del self.pending[other]
+
+            if key not in self.pending:
+                future = self.__submit(file)
+                self.pending[key] = future
+                future.add_done_callback(lambda done: self.__store(key, done))
+        return None
+
+    def cancel(self) -> None:
+        """Cancel all conversions which did not start yet."""
+        with self.lock:
+            for key in [key for key, future in self.pending.items() if future.cancel()]:
+                del self.pending[key]
+
+    def __submit(self, file: str) -> Future:
+        """Start converting a file, replacing the pool if a worker died."""
+        # multiprocessing is only loaded when needed
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        if self.executor is not None:
+            try:
+                return self.executor.submit(render_preview, file, self.cols)
+            except BrokenProcessPool:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+        # Forking while `main.warm_up` imports NumPy in another thread would copy its held import lock into the
+        # workers, so they are started from a fresh process instead
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self.executor.submit(render_preview, file, self.cols)
+
+    def __store(self, key: Tuple[str, int], future: Future) -> None:
+        """Cache the result of a finished conversion, also if nobody is waiting for it anymore."""
+        if future.cancelled():
+            return
+        with self.lock:
+            self.pending.pop(key, None)
+            error = future.exception()
+            if error is not None and not isinstance(error, OSError):
+                # not a problem of the file, it is converted again when requested the next time
+                failures, _ = self.failed.get(key, (0, None))
+                self.failed[key] = (failures + 1, error)
+                return
+            self.failed.pop(key, None)
+            self.cache[key] = error or future.result()
+            while len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
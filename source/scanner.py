@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Number of directory listings to keep
+CACHE_SIZE = 64
+
+# Cached listings of (folder, extensions) -> (mtime, directories, files), least recently used first
+_cache: 'OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[int, List[str], List[str]]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class DirectoryScan(threading.Thread):
+    """List the directories and files of a folder in a background thread.
+
+    Entries are appended to `dirs` and `files` as they are found, so they can be shown before the scan is done.
+    Listings are cached by the modification time of the folder, a cached listing is available right away and only
+    replaced if the folder changed in the meantime.
+    """
+
+    def __init__(self, folder: str, extensions: Tuple[str, ...]) -> None:
+        """Start scanning a folder
+
+        :param folder: The folder to list
+        :param extensions: File name endings of the files to list, compared case-insensitively
+        """
+        super().__init__(daemon=True)
+        self.folder = folder
+        self.extensions = tuple(extension.lower() for extension in extensions)
+
+        self.dirs: List[str] = []
+        self.files: List[str] = []
+        self.version = 0  # increased whenever the listing changes
+        self.error: Optional[OSError] = None
+        self.done = threading.Event()
+        self.cancelled = False
+
+        with _cache_lock:
+            cached = _cache.get((self.folder, self.extensions))
+            if cached is not None:
+                _cache.move_to_end((self.folder, self.extensions))
+        self.mtime = None
+        if cached is not None:
+            self.mtime, dirs, files = cached
+            self.dirs, self.files = list(dirs), list(files)
+            self.version += 1
+
+        self.start()
+
+    def cancel(self) -> None:
+        """Stop scanning, the entries found so far are kept"""
+        self.cancelled = True
+
+    def run(self) -> None:
+        """List the folder, unless the cached listing is still up to date"""
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+            if mtime == self.mtime:
+                return
+
+            # a cached listing stays visible until the new one is complete
+            stream = self.mtime is None
+            dirs, files = (self.dirs, self.files) if stream else ([], [])
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if self.cancelled:
+                        return
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue  # vanished or unreadable entry
+                    if is_dir:
+                        dirs.append(entry.name + '/')
+                    elif entry.name.lower().endswith(self.extensions):
+                        files.append(entry.name)
+                    else:
+                        continue
+                    if stream:
+                        self.version += 1
+
+            if not stream:
+                self.dirs, self.files = dirs, files
+                self.version += 1
+            self.mtime = mtime
+
+            with _cache_lock:
+                _cache[(self.folder, self.extensions)] = (mtime, list(dirs), list(files))
+                _cache.move_to_end((self.folder, self.extensions))
+                while len(_cache) > CACHE_SIZE:
+                    _cache.popitem(last=False)
+        except OSError as error:
+            self.error = error
+        finally:
+            self.done.set()
@@ -0,0 +1,217 @@
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from blessed import Terminal as Interface
+from wcwidth import wcwidth
+
+if TYPE_CHECKING:
+    # Interface is a subclass of Terminal, importing it directly would cause circular imports
+    from main import Interface  # noqa: F811
+
+# Control sequences appearing in rendered menus: CSI sequences, charset selection, other escapes and control chars
+SEQUENCE = re.compile(r'\x1b\[([?>]?)([0-9;]*)([@-~])|\x1b[()][0-9A-Za-z]|\x1b[0-9=>A-Za-z]|[\n\r\b]')
+
+# A cell on the screen, the character and the SGR sequences styling it. A wide character takes up two cells, the
+# second one holds an empty string. Combining characters are added to the character of the cell they follow.
+Cell = Tuple[str, str]
+BLANK: Cell = (' ', '')
+
+# Runs of characters which take up one cell each, the ones making up most frames, or any other single character
+NARROW = re.compile(r'([ -~\u2500-\u257f]+)|.', re.DOTALL)
+
+# Number of cells taken up by the characters seen so far, -1 for characters which are not printable
+_widths: Dict[str, int] = {}
+
+
+def char_width(char: str) -> int:
+    """Number of cells a character takes up on the terminal."""
+    width = _widths.get(char)
+    if width is None:
+        width = _widths[char] = wcwidth(char)
+    return width
+
+
+class Screen:
+    """Double-buffered screen, turning a rendered frame into the output needed to update the last one.
+
+    Frames are drawn onto a grid of cells by following the cursor movements, styles and line wrapping of the
+    terminal, wide characters taking up two cells. Only the cells which differ from the previous frame are written.
+    """
+
+    # Number of unchanged cells rewritten between two changed ones, instead of moving the cursor past them
+    BRIDGE = 4
+
+    cells: List[List[Cell]]
+
+    def __init__(self) -> None:
+        self.size: Optional[Tuple[int, int]] = None
+        self.cells = []
+
+    def update(self, term: Interface, frame: str) -> str:
+        """Draw a new frame and return the output needed to update the terminal from the previous one."""
+        size = (term.width, term.height)
+        cells = self.draw(frame, *size)
+
+        if size != self.size:
+            # nothing is known about the terminal contents, start over with a cleared screen
+            previous = [[BLANK] * size[0] for _ in range(size[1])]
+            output = [term.normal + term.clear]
+        else:
+            previous = self.cells
+            output = []
+
+        for y, (row, old) in enumerate(zip(cells, previous)):
+            if row == old:
+                continue
+            x = 0
+            while x < size[0]:
+                if row[x] == old[x]:
+                    x += 1
+                    continue
+                # extend the run over changed cells and short unchanged gaps
+                start = end = x
+                while x < size[0] and x - end <= self.BRIDGE:
+                    if row[x] != old[x]:
+                        end = x + 1
+                    x += 1
+                if row[start][0] == '' and start > 0:
+                    start -= 1  # start at the wide character the changed cell belongs to
+                output.append(term.move_yx(y, start) + self.cells_to_str(term, row[start:end]))
+
+        self.size = size
+        self.cells = cells
+        return ''.join(output)
+
+    def invalidate(self) -> None:
+        """Forget the previous frame, so the next update redraws the whole screen."""
+        self.size = None
+
+    @staticmethod
+    def cells_to_str(term: Interface, cells: List[Cell]) -> str:
+        """Write out a run of cells, switching styles where needed."""
+        output = []
+        style = None
+        for char, cell_style in cells:
+            if not char:
+                continue  # covered by the wide character before it
+            if cell_style != style:
+                output.append(term.normal + cell_style)
+                style = cell_style
+            output.append(char)
+        output.append(term.normal)
+        return ''.join(output)
+
+    @staticmethod
+    def draw(frame: str, width: int, height: int) -> List[List[Cell]]:
+        """Draw a frame onto an empty grid of cells, the way the terminal would."""
+        cells = [[BLANK] * width for _ in range(height)]
+        x = y = 0
+        style = ''
+        wrap = False  # the last column was written, the next character goes to the next line
+
+        def line_feed() -> int:
+            if y < height - 1:
+                return y + 1
+            # scroll up
+            cells.pop(0)
+            cells.append([BLANK] * width)
+            return y
+
+        def write(text: str) -> None:
+            nonlocal x, y, wrap
+            last = None  # the cell written last, combining characters are added to it
+            for run in NARROW.finditer(text):
+                chars = run.group()
+                size = 1 if run.lastindex else char_width(chars)
+                if size == 0:
+                    if last is not None:
+                        previous, previous_style = cells[last[1]][last[0]]
+                        cells[last[1]][last[0]] = (previous + chars, previous_style)
+                    continue
+                elif size < 0:
+                    continue  # not printable, the terminal ignores it
+
+                while chars:
+                    if wrap or x + size > width:
+                        # a wide character which does not fit in the last column goes to the next line
+                        x, y, wrap = 0, line_feed(), False
+                        if size > width:
+                            break
+                    count = min(len(chars), (width - x) // size)
+                    row = cells[y]
+                    end = x + count * size
+                    # overwriting half of a wide character erases the other half
+                    if not row[x][0] and x > 0:
+                        row[x - 1] = BLANK
+                    if end < width and not row[end][0]:
+                        row[end] = BLANK
+                    if size == 2:
+                        row[x:end] = [(chars, style), ('', style)]
+                    else:
+                        row[x:end] = [(char, style) for char in chars[:count]]
+                    chars = chars[count:]
+                    last = (end - size, y)
+                    if end == width:
+                        x, wrap = width - 1, True
+                    else:
+                        x = end
+
+        position = 0
+        for match in SEQUENCE.finditer(frame):
+            write(frame[position:match.start()])
+            position = match.end()
+            sequence = match.group()
+
+            if sequence == '\n':
+                x, y, wrap = 0, line_feed(), False
+                continue
+            elif sequence == '\r':
+                x, wrap = 0, False
+                continue
+            elif sequence == '\b':
+                x, wrap = max(0, x - 1), False
+                continue
+            elif match.group(3) is None or match.group(1):
+                continue  # charset selection and private modes do not change the contents
+
+            params = [int(param) if param else 0 for param in match.group(2).split(';')]
+            command = match.group(3)
+            count = max(1, params[0])
+            if command == 'm':
+                # an empty or zero parameter resets the style
+                style = '' if params in ([0], [0, 0]) else style + sequence
+                continue
+
+            wrap = False
+            if command in 'Hf':
+                y, x = max(1, params[0]) - 1, max(1, params[-1] if len(params) > 1 else 1) - 1
+            elif command == 'd':
+                y = count - 1
+            elif command == 'G':
+                x = count - 1
+            elif command == 'A':
+                y -= count
+            elif command == 'B':
+                y += count
+            elif command == 'C':
+                x += count
+            elif command == 'D':
+                x -= count
+            elif command == 'J':
+                if params[0] in (2, 3):
+                    cells = [[BLANK] * width for _ in range(height)]
+                elif params[0] == 0:
+                    cells[y][x:] = [BLANK] * (width - x)
+                    cells[y + 1:] = [[BLANK] * width for _ in range(height - y - 1)]
+            elif command == 'K':
+                if params[0] == 0:
+                    cells[y][x:] = [BLANK] * (width - x)
+                elif params[0] == 1:
+                    cells[y][:x + 1] = [BLANK] * (x + 1)
+                else:
+                    cells[y] = [BLANK] * width
+            x = max(0, min(x, width - 1))
+            y = max(0, min(y, height - 1))
+        write(frame[position:])
+
+        return cells
@@ -1,30 +1,28 @@
 import datetime
 import random
+from array import array
 from dataclasses import dataclass
-from typing import List
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
 
-from main import Interface
+from blessed import Terminal as Interface
 
+if TYPE_CHECKING:
+    # Interface is a subclass of Terminal, importing it directly would cause circular imports
+    from main import Interface  # noqa: F811
 
-def walk(string: str, step: int) -> str:
-    """Helper generator to iterate over a string with steps"""
-    for i in range(0, len(string), step):
-        yield string[i:i+step]
+
+# Moves (dx, dy) of the empty piece, named like the `Puzzle.move_*` methods
+MOVES = {'U': (0, -1), 'D': (0, 1), 'L': (-1, 0), 'R': (1, 0)}
 
 
 def join(row: List[List[str]]) -> List[str]:
     """Join together a row of puzzle pieces into a complete list of lines"""
-    res = []
-    for i in range(len(row[0])):
-        res.append('│')
-        for piece in row:
-            res[i] += piece[i]
-    return res
+    return ['│' + '│'.join(lines) + '│' for lines in zip(*row)]
 
 
-def bordered(lines: List[str]) -> List[str]:
-    """Put a border after every line"""
-    return [line + '│' for line in lines]
+def distance(a: int, b: int, horizontal: int) -> int:
+    """Manhattan distance between two flat positions on a board `horizontal` pieces wide."""
+    return abs(a % horizontal - b % horizontal) + abs(a // horizontal - b // horizontal)
 
 
 @dataclass
@@ -36,8 +34,18 @@ class PiecePosition:
     index: int
 
 
+@dataclass
+class Region:
+    """Rectangle of characters in the drawn puzzle, relative to its top left corner"""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
 class PuzzlePiece:
-    """Piece of a bigger puzzle."""
+    """Piece of a bigger puzzle, a view of its part of the image shared by all pieces."""
 
     index: int
     empty: bool
@@ -45,9 +53,18 @@ class PuzzlePiece:
     width: int
     height: int
 
-    __slots__ = ('index', 'empty', 'width', 'height', '_data')
+    __slots__ = ('index', 'empty', 'width', 'height', '_image', '_x', '_y')
+
+    def __init__(self, index: int, width: int, height: int, image: List[str], x: int, y: int) -> None:
+        """Initialize the piece.
 
-    def __init__(self, index: int, width: int, height: int) -> None:
+        :param index: Position of the piece in the solved puzzle
+        :param width: Width of the piece in characters
+        :param height: Height of the piece in lines
+        :param image: The image of the puzzle, it is not copied
+        :param x: Column of the image the piece starts at
+        :param y: Line of the image the piece starts at
+        """
         self.empty = False
 
         self.index = index
@@ -55,46 +72,147 @@ class PuzzlePiece:
         self.width = width
         self.height = height
 
-        self._data = []
+        self._image = image
+        self._x = x
+        self._y = y
 
     def __repr__(self) -> str:
         return f'<PuzzlePiece index={self.index} width={self.width} height={self.height} empty={self.empty}>'
 
     def __bool__(self) -> bool:
-        return bool(self._data)
+        return self.width > 0 and self.height > 0
+
+    @property
+    def lines(self) -> List[str]:
+        """The lines of the image covered by the piece."""
+        x = self._x
+        return [line[x:x + self.width] for line in self._image[self._y:self._y + self.height]]
 
     def get_data(self, term: Interface, *, solved: bool = False) -> List[str]:
         """List of lines of the image."""
         if self.empty and solved:
-            return [term.webgray_on_black(line) for line in self._data]
+            return [term.webgray_on_black(line) for line in self.lines]
         else:
-            return [' ' * self.width] * self.height if self.empty else self._data
-
-    def append(self, string: str) -> None:
-        """Append a string to the end of the data list."""
-        self._data.append(string)
+            return [' ' * self.width] * self.height if self.empty else self.lines
 
     def clear(self) -> None:
         """Clear the piece data"""
         self.empty = True
 
 
+class Board:
+    """Compact state of a puzzle, used for snapshots, shuffling and solving.
+
+    The arrangement is stored as a flat array of piece indices, position `y * horizontal + x` holding the piece
+    shown there. The lines of the pieces are not part of the board, so copying a board only copies the array.
+    """
+
+    dim: Tuple[int, int]
+    tiles: array
+    empty: Optional[int]
+    misplaced: int
+
+    __slots__ = ('dim', 'tiles', 'empty', 'misplaced')
+
+    def __init__(self, dim: Tuple[int, int], tiles: Optional[array] = None, empty: Optional[int] = None) -> None:
+        """Initialize the board.
+
+        :param dim: Number of (horizontal, vertical) pieces
+        :param tiles: Index of the piece at every position, defaults to the solved arrangement
+        :param empty: Position of the empty piece, None if no piece is empty
+        """
+        self.dim = dim
+        self.tiles = array('H', range(dim[0] * dim[1])) if tiles is None else tiles
+        self.empty = empty
+        self.misplaced = sum(index != position for position, index in enumerate(self.tiles))
+
+    def __repr__(self) -> str:
+        return f'<Board dim={self.dim} empty={self.empty} misplaced={self.misplaced}>'
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Board) and self.tiles == other.tiles and self.empty == other.empty
+
+    def __hash__(self) -> int:
+        return hash((self.tiles.tobytes(), self.empty))
+
+    @property
+    def solved(self) -> bool:
+        """Whether every piece is at its solved position."""
+        return self.misplaced == 0
+
+    @property
+    def solvable(self) -> bool:
+        """Whether the solved arrangement can be reached by moving the empty piece.
+
+        Every move swaps two pieces and moves the empty piece by one, so the parity of the permutation always
+        equals the parity of the distance between the empty piece and its solved position.
+        """
+        if self.empty is None:
+            return self.solved
+
+        seen = bytearray(len(self.tiles))
+        transpositions = 0
+        for start in range(len(self.tiles)):
+            length = 0
+            position = start
+            while not seen[position]:
+                seen[position] = 1
+                position = self.tiles[position]
+                length += 1
+            transpositions += max(0, length - 1)
+
+        return transpositions % 2 == distance(self.tiles[self.empty], self.empty, self.dim[0]) % 2
+
+    def copy(self) -> 'Board':
+        """Copy the arrangement."""
+        board = Board.__new__(Board)
+        board.dim = self.dim
+        board.tiles = self.tiles[:]
+        board.empty = self.empty
+        board.misplaced = self.misplaced
+        return board
+
+    def swap(self, a: int, b: int) -> None:
+        """Swap the pieces at two flat positions."""
+        tiles = self.tiles
+        self.misplaced -= (tiles[a] != a) + (tiles[b] != b)
+        tiles[a], tiles[b] = tiles[b], tiles[a]
+        self.misplaced += (tiles[a] != a) + (tiles[b] != b)
+        if self.empty == a:
+            self.empty = b
+        elif self.empty == b:
+            self.empty = a
+
+    def move(self, dx: int, dy: int) -> bool:
+        """Move the empty piece by one position, returning False if that would leave the board."""
+        x, y = self.empty % self.dim[0] + dx, self.empty // self.dim[0] + dy
+        if not (0 <= x < self.dim[0] and 0 <= y < self.dim[1]):
+            return False
+        self.swap(self.empty, y * self.dim[0] + x)
+        return True
+
+
 class Puzzle:
     """Main puzzle game class, taking care of the whole game logic."""
 
     rows: List[List[PuzzlePiece]]
+    # Position (x, y) of the empty piece, kept up to date by `_swap_pieces`
+    empty: Optional[Tuple[int, int]]
+    # Positions (x, y) of the pieces which changed since the last call of `dirty_regions`
+    dirty: Set[Tuple[int, int]]
 
     def __init__(self, image: List[str], horizontal: int, vertical: int) -> None:
         """Initialize the Puzzle with an image and size to split it by.
 
-        :param image: A list of ASCII string rows
+        :param image: A list of ASCII string rows, it is not changed
         :param horizontal: Amount of horizontal rows
         :param vertical: Amount of vertical rows
         """
         self.moves_done = 0
         self.start_time = datetime.datetime.now()
-        self.time_needed = 0
+        self.end_time = None
 
+        image = list(image)  # the rows are cropped or padded below, the caller may keep using the image
         length = len(image[0])
         for line in image:
             if length != len(line):  # Make sure that all strings are equal in length
@@ -149,111 +267,161 @@ class Puzzle:
             for _ in range(other):
                 image.append(image[-1])
 
+        # The pieces are views of the cropped image, their lines are sliced out when drawing
+        self.image = image
         rows: List[List[PuzzlePiece]] = [
             [
                 # This will give each PuzzlePiece an index from 0 to (horizontal*vertical - 1)
-                PuzzlePiece(i, width, height) for i in range(v*horizontal, v*horizontal+horizontal)
+                PuzzlePiece(v*horizontal + h, width, height, image, h * width, v * height) for h in range(horizontal)
             ] for v in range(vertical)
         ]
 
-        for i, line in enumerate(image):
-            for j, column in enumerate(walk(line, width)):
-                rows[i//height][j].append(column)
-
         self.dim = (horizontal, vertical)
         self.rows = rows
 
+        # Everything that does not depend on the arrangement is only built once
+        self.borders = {
+            'top': self.build_border(start='┌', middle='┬', end='┐'),
+            'separator': self.build_border(start='├', middle='┼', end='┤'),
+            'bottom': self.build_border(start='└', middle='┴', end='┘'),
+        }
+        self.blank_block = [' ' * width] * height
+        # Drawn lines of every row of pieces, None once a piece of the row moved
+        self.drawn: List[Optional[List[str]]] = [None] * vertical
+        self.drawn_solved = False
+        self.dirty = set()
+        self.empty = None  # No piece is empty until the puzzle is shuffled
+        self.misplaced = 0  # Number of pieces not at their solved position, kept up to date by `_swap_pieces`
+
     def __repr__(self) -> str:
         return f'<Puzzle solved={self.solved} rows={self.rows}>'
 
     @property
     def solved(self) -> bool:
         """Whether the puzzle is considered solved."""
-        i = 0
-        self.time_needed = (datetime.datetime.now() - self.start_time).seconds  # updates time elapsed
-        for row in self.rows:
-            for piece in row:
-                if piece.index != i:
-                    return False
-
-                i += 1
-        return True
+        return self.misplaced == 0
 
-    def build_border(self, puzzle: int, piece: int, *, start: str, middle: str, end: str) -> str:
+    @property
+    def board(self) -> Board:
+        """Snapshot of the current arrangement as a compact `Board`."""
+        tiles = array('H', (piece.index for row in self.rows for piece in row))
+        empty = None if self.empty is None else self.empty[1] * self.dim[0] + self.empty[0]
+        return Board(self.dim, tiles, empty)
+
+    def load_board(self, board: Board) -> None:
+        """Arrange the pieces like in the given board, for example to restore a snapshot."""
+        pieces = sorted((piece for row in self.rows for piece in row), key=lambda piece: piece.index)
+        for piece in pieces:
+            piece.empty = False
+        self.rows = [
+            [pieces[board.tiles[position]] for position in range(v * self.dim[0], (v + 1) * self.dim[0])]
+            for v in range(self.dim[1])
+        ]
+
+        self.empty = None
+        if board.empty is not None:
+            self.empty = (board.empty % self.dim[0], board.empty // self.dim[0])
+            self.rows[self.empty[1]][self.empty[0]].clear()
+        self.misplaced = board.misplaced
+        self.drawn = [None] * self.dim[1]
+        self.dirty.update((x, y) for y in range(self.dim[1]) for x in range(self.dim[0]))
+
+    @property
+    def time_needed(self) -> int:
+        """Seconds spent on the puzzle, the time stops when it is solved."""
+        end_time = self.end_time or datetime.datetime.now()
+        return (end_time - self.start_time).seconds
+
+    def build_border(self, *, start: str, middle: str, end: str) -> str:
         """Build puzzle border line."""
-        # We subtract 2 to accomodate for start and end characters.
-        res = start + '─' * (puzzle - 2) + end
-        border_count = 1
-        for i in range(piece, (puzzle - piece)):
-            if i % piece == 0:
-                pos = i + border_count
-                res = res[:pos] + middle + res[pos + 1:]
-                border_count += 1
-        return res
+        piece_width = self.rows[0][0].width
+        return start + middle.join(['─' * piece_width] * self.dim[0]) + end
 
     def draw(self, term: Interface) -> str:
         """Draw the puzzle in its current state."""
-        nbr_separators = len(self.rows) - 1
-        piece_width = self.rows[0][0].width
-        puzzle_width = piece_width * len(self.rows[0]) + nbr_separators
-
-        # build the top border
-        output = [self.build_border(puzzle_width, piece_width, start='┌', middle='┬', end='┐')]
+        solved = self.solved
+        if solved != self.drawn_solved:
+            # the empty piece is shown when solved
+            self.drawn = [None] * self.dim[1]
+            self.drawn_solved = solved
+        output = [self.borders['top']]
 
-        # build content
         for index, row in enumerate(self.rows):
-            row = [bordered(piece.get_data(term, solved=self.solved)) for piece in row]
-            output.extend(join(row))
+            if self.drawn[index] is None:
+                self.drawn[index] = join([self._block(term, piece, solved) for piece in row])
+            output.extend(self.drawn[index])
             if index < len(self.rows) - 1:
-                output.extend([self.build_border(puzzle_width, piece_width, start="├", middle="┼", end="┤")])
-
-        # add bottom border
-        output += [self.build_border(puzzle_width, piece_width, start='└', middle="┴", end='┘')]
+                output.append(self.borders['separator'])
 
+        output.append(self.borders['bottom'])
         return '\n'.join(output)
 
-    def shuffle(self, difficulty: int = 50) -> None:
-        """Shuffle the puzzle by randomizing the order of the pieces
+    def dirty_regions(self) -> List[Region]:
+        """Regions of the drawn puzzle which changed since the last call, one per piece."""
+        width, height = self.rows[0][0].width, self.rows[0][0].height
+        regions = [
+            Region(x=1 + x * (width + 1), y=1 + y * (height + 1), width=width, height=height)
+            for x, y in sorted(self.dirty, key=lambda position: (position[1], position[0]))
+        ]
+        self.dirty.clear()
+        return regions
 
-        :param difficulty: approx. maximum number of iterations
+    def _block(self, term: Interface, piece: PuzzlePiece, solved: bool) -> List[str]:
+        """Lines of a piece."""
+        if piece.empty:
+            return piece.get_data(term, solved=True) if solved else self.blank_block
+        return piece.lines
+
+    def shuffle(self, difficulty: Optional[int] = None) -> None:
+        """Shuffle the puzzle into a random arrangement which can be solved
+
+        :param difficulty: Manhattan distance (summed over all pieces) from the solved arrangement to aim for.
+               None (default) picks any solvable arrangement with equal probability.
         """
-        random.choice(random.choice(self.rows)).clear()
-        clear_id = self._get_empty_piece_position()
-        clear_id = [clear_id.x, clear_id.y]
-        hash_list = [[v * self.dim[0] + i for i in range(self.dim[0])] for v in range(self.dim[1])]
-        print(hash_list)
-        iters = random.randint(difficulty // 2, difficulty)
-
-        for i in range(iters):
-            # get the piece to move
-            axis = random.choice([0, 1])
-            incr = random.choice([1, -1])
-            index = clear_id.copy()
-            if clear_id[axis] + incr in range(0, self.dim[axis]):
-                index[axis] = clear_id[axis] + incr
-            else:
-                index[axis] = clear_id[axis] - incr
-
-            # swap values
-            hash_list[index[1]][index[0]], hash_list[clear_id[1]][clear_id[0]] \
-                = hash_list[clear_id[1]][clear_id[0]], hash_list[index[1]][index[0]]
-            clear_id = index
-            print(hash_list)
-        for v, row in enumerate(self.rows):
-            for h, piece in enumerate(row):
-                index = hash_list[v][h]
-                y2 = index // self.dim[1]
-                x2 = index % self.dim[1]
-                self._swap_pieces(h, v, x2, y2)
+        blank = random.randrange(self.dim[0] * self.dim[1])
+        board = self._random_board(blank) if difficulty is None else self._walk_board(blank, difficulty)
+
+        self.load_board(board)
+        self.moves_done = 0
+        self.start_time = datetime.datetime.now()
+        self.end_time = None
+
+    def _random_board(self, blank: int) -> Board:
+        """Draw a random permutation, fixing its parity if it can not be solved."""
+        while True:
+            tiles = array('H', range(self.dim[0] * self.dim[1]))
+            random.shuffle(tiles)
+            board = Board(self.dim, tiles, tiles.index(blank))
+            if not board.solvable:
+                # swapping two pieces other than the empty one flips the parity
+                a, b = [position for position in range(3) if position != board.empty][:2]
+                board.swap(a, b)
+            if not board.solved:
+                return board
+
+    def _walk_board(self, blank: int, difficulty: int) -> Board:
+        """Move the empty piece randomly, until the pieces are `difficulty` away from their solved positions."""
+        horizontal = self.dim[0]
+        board = Board(self.dim, empty=blank)
+        manhattan = 0
+        last = None
+        # give up on difficulties the board is too small for
+        for _ in range(difficulty * 100):
+            if manhattan >= difficulty:
+                break
+            # don't undo the previous move
+            options = [move for move in MOVES.values() if move != last]
+            dx, dy = random.choice(options)
+            empty = board.empty
+            if board.move(dx, dy):
+                piece = board.tiles[empty]
+                manhattan += distance(empty, piece, horizontal) - distance(board.empty, piece, horizontal)
+                last = (-dx, -dy)
+        return board
 
     def _get_empty_piece_position(self) -> PiecePosition:
-        x, y, index = [
-            (x, y, piece.index)
-            for y, row in enumerate(self.rows)
-            for x, piece in enumerate(row)
-            if piece.empty
-        ][0]
-        return PiecePosition(x=x, y=y, index=index)
+        x, y = self.empty
+        return PiecePosition(x=x, y=y, index=self.rows[y][x].index)
 
     def move_up(self) -> None:
         """Move the piece above the empty piece down"""
@@ -289,6 +457,56 @@ class Puzzle:
         # swap the empty piece with the target piece
         self._swap_pieces(x1=empty_pos.x, y1=empty_pos.y, x2=empty_pos.x - 1, y2=empty_pos.y)
 
+    def _misplaced_at(self, x: int, y: int) -> int:
+        return int(self.rows[y][x].index != y * self.dim[0] + x)
+
+    def apply_moves(self, moves: str, strict: bool = True) -> int:
+        """Apply a sequence of moves in one go
+
+        :param moves: The letters U, D, L and R, moving the empty piece like `move_up`, `move_down`, `move_left` and
+               `move_right`
+        :param strict: Raise a ValueError if a move would leave the board, instead of skipping it like the move methods
+        :return: Number of moves applied, the moves after the one solving the puzzle are not applied
+        """
+        unknown = set(moves) - MOVES.keys()
+        if unknown:
+            raise ValueError(f'Unknown moves: {"".join(sorted(unknown))}')
+        if self.empty is None:
+            raise ValueError('The puzzle has no empty piece, shuffle it first')
+
+        # validate the whole sequence before changing anything
+        x, y = self.empty
+        swaps = []
+        for i, move in enumerate(moves):
+            dx, dy = MOVES[move]
+            if 0 <= x + dx < self.dim[0] and 0 <= y + dy < self.dim[1]:
+                swaps.append((x, y, x + dx, y + dy))
+                x, y = x + dx, y + dy
+            elif strict:
+                raise ValueError(f'Move {i} ({move}) would leave the board')
+
+        for applied, swap in enumerate(swaps, start=1):
+            self._swap_pieces(*swap)
+            if self.solved:
+                return applied
+        return len(swaps)
+
     def _swap_pieces(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        self.misplaced -= self._misplaced_at(x1, y1) + self._misplaced_at(x2, y2)
         self.rows[y1][x1], self.rows[y2][x2] = self.rows[y2][x2], self.rows[y1][x1]
+        self.misplaced += self._misplaced_at(x1, y1) + self._misplaced_at(x2, y2)
+        self.dirty.update(((x1, y1), (x2, y2)))
+        self.drawn[y1] = self.drawn[y2] = None
+        # stop the time as soon as the puzzle is solved
+        if self.misplaced == 0:
+            self.end_time = self.end_time or datetime.datetime.now()
+            if self.empty is not None:
+                self.dirty.add(self.empty)  # the empty piece is shown when solved
+        else:
+            self.end_time = None
+        # keep track of where the empty piece went
+        if self.empty == (x1, y1):
+            self.empty = (x2, y2)
+        elif self.empty == (x2, y2):
+            self.empty = (x1, y1)
         self.moves_done += 1
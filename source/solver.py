@@ -0,0 +1,548 @@
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from heapq import heappop, heappush
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sliding_puzzle import MOVES, Board, distance
+
+# Goal positions grouped into one pattern database each, for the board sizes which have pattern databases. The
+# group holding the empty piece leaves it out. Compact blocks give higher estimates than lines of the same size.
+PATTERN_GROUPS = {
+    (4, 4): ((0, 1, 4, 5, 8, 9), (2, 3, 6, 7, 10, 11), (12, 13, 14, 15)),
+    (5, 5): ((0, 1, 2, 5, 6), (3, 4, 7, 8, 9), (10, 11, 12, 15, 16), (13, 14, 17, 18, 19), (20, 21, 22, 23, 24)),
+}
+
+# Largest board (in pieces) for which an optimal solution is searched
+OPTIMAL_LIMIT = 25
+
+# Weight of the piece distances in the suboptimal search, higher values find a solution faster but longer
+GREEDY_WEIGHT = 8
+
+
+@dataclass
+class Solution:
+    """Moves of the empty piece solving a puzzle"""
+
+    moves: str
+    optimal: bool
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+
+class Timeout(Exception):
+    """Raised when a search exceeds its time budget."""
+
+
+class Cancelled(Exception):
+    """Raised when a search is no longer needed, see `Solver`."""
+
+
+@lru_cache(maxsize=None)
+def neighbours(dim: Tuple[int, int]) -> List[List[Tuple[str, int]]]:
+    """List the moves and resulting positions of the empty piece for every position on the board."""
+    horizontal, vertical = dim
+    res = []
+    for position in range(horizontal * vertical):
+        x, y = position % horizontal, position // horizontal
+        res.append([
+            (move, (y + dy) * horizontal + x + dx)
+            for move, (dx, dy) in MOVES.items()
+            if 0 <= x + dx < horizontal and 0 <= y + dy < vertical
+        ])
+    return res
+
+
+@lru_cache(maxsize=None)
+def mirror(dim: Tuple[int, int]) -> List[int]:
+    """Position of every position mirrored along the diagonal of a square board."""
+    horizontal, vertical = dim
+    if horizontal != vertical:
+        raise ValueError('Only square boards can be mirrored')
+    return [position % horizontal * horizontal + position // horizontal for position in range(horizontal * vertical)]
+
+
+def line_conflicts(goals: Sequence[int]) -> int:
+    """Extra moves needed for the pieces in one row or column which are in their goal line, but in the wrong order.
+
+    :param goals: The goal offsets within the line of these pieces, in their current order
+    :return: Two moves for every piece which has to leave the line to let the others pass
+    """
+    # the pieces which can stay form the longest increasing subsequence
+    tails: List[int] = []
+    for goal in goals:
+        i = bisect_left(tails, goal)
+        tails[i:i + 1] = [goal]
+    return 2 * (len(goals) - len(tails))
+
+
+class PatternDatabase:
+    """Additive pattern database for a group of pieces.
+
+    Stores, for every placement of the pieces of the group, the number of moves of these pieces needed to get
+    them to their goal positions. Moves of other pieces, including the empty one, are free, which makes the
+    databases of disjoint groups additive and independent of which piece is empty.
+    """
+
+    folder = os.path.dirname(__file__) + '/../resources/pattern_databases'
+
+    # Databases already loaded, keyed by board size and pieces
+    loaded: Dict[Tuple[Tuple[int, int], Tuple[int, ...]], 'PatternDatabase'] = {}
+
+    def __init__(self, dim: Tuple[int, int], pieces: Tuple[int, ...], table: bytearray) -> None:
+        """Initialize the database.
+
+        :param dim: Number of (horizontal, vertical) pieces of the board
+        :param pieces: The pieces in this group, which are also their goal positions
+        :param table: Distance for every placement, indexed by the sum of `position * weight` of the pieces
+        """
+        self.dim = dim
+        self.pieces = pieces
+        self.table = table
+        size = dim[0] * dim[1]
+        self.weights = [size ** k for k in range(len(pieces))]
+
+    def __repr__(self) -> str:
+        return f'<PatternDatabase dim={self.dim} pieces={self.pieces}>'
+
+    @property
+    def filename(self) -> str:
+        """File the database is persisted in."""
+        return os.path.join(
+            self.folder, f'{self.dim[0]}x{self.dim[1]}-' + '-'.join(str(piece) for piece in self.pieces) + '.pdb'
+        )
+
+    @classmethod
+    def build(cls, dim: Tuple[int, int], pieces: Tuple[int, ...]) -> 'PatternDatabase':
+        """Compute the database with a breadth first search from the goal placement.
+
+        The search handles a whole level of placements at once with NumPy, groups of six pieces on a 4x4 board
+        take a few seconds.
+        """
+        # only needed to build databases, not to use them
+        import numpy as np
+
+        horizontal, vertical = dim
+        size = horizontal * vertical
+        weights = np.array([size ** k for k in range(len(pieces))], dtype=np.int64)
+
+        table = np.full(size ** len(pieces), 255, dtype=np.uint8)
+        level = np.array([sum(piece * int(weight) for piece, weight in zip(pieces, weights))], dtype=np.int64)
+        table[level] = 0
+        cost = 0
+        while level.size:
+            cost += 1
+            positions = level[:, None] // weights % size
+            for k, weight in enumerate(weights):
+                x, y = positions[:, k] % horizontal, positions[:, k] // horizontal
+                for dx, dy in MOVES.values():
+                    target = positions[:, k] + dy * horizontal + dx
+                    # the piece stays on the board and does not move onto another piece of the group
+                    valid = (0 <= x + dx) & (x + dx < horizontal) & (0 <= y + dy) & (y + dy < vertical)
+                    valid &= ~(positions == target[:, None]).any(axis=1)
+                    moved = level[valid] + (target[valid] - positions[valid, k]) * weight
+                    table[moved[table[moved] == 255]] = cost
+            level = np.flatnonzero(table == cost)
+        return cls(dim, pieces, bytearray(table.tobytes()))
+
+    @classmethod
+    def load(cls, dim: Tuple[int, int], pieces: Tuple[int, ...], build: bool = False) -> Optional['PatternDatabase']:
+        """Load the database from disk, or build and save it if `build` is set.
+
+        :return: The database, None if it was not computed yet and `build` is not set
+        """
+        key = (dim, pieces)
+        if key not in cls.loaded:
+            database = cls(dim, pieces, bytearray())
+            try:
+                with open(database.filename, mode='rb') as file:
+                    database.table = bytearray(file.read())
+            except FileNotFoundError:
+                if not build:
+                    return None
+                database = cls.build(dim, pieces)
+                database.save()
+            cls.loaded[key] = database
+        return cls.loaded[key]
+
+    def save(self) -> None:
+        """Persist the database."""
+        os.makedirs(self.folder, exist_ok=True)
+        temp = f'{self.filename}.{os.getpid()}.tmp'
+        with open(temp, mode='wb') as file:
+            file.write(self.table)
+        os.replace(temp, self.filename)
+
+
+def pattern_groups(dim: Tuple[int, int], blank: int) -> List[Tuple[int, ...]]:
+    """Split the pieces of a board, except the empty one, into the groups of `PATTERN_GROUPS`."""
+    groups = [tuple(piece for piece in group if piece != blank) for group in PATTERN_GROUPS[dim]]
+    return [group for group in groups if group]
+
+
+def pattern_databases(dim: Tuple[int, int], blank: int, build: bool = False) -> List[PatternDatabase]:
+    """Pattern databases covering all pieces except the empty one, empty if not all of them are available."""
+    if dim not in PATTERN_GROUPS:
+        return []
+    databases = [PatternDatabase.load(dim, group, build) for group in pattern_groups(dim, blank)]
+    return databases if all(databases) else []
+
+
+def build_pattern_databases(dim: Tuple[int, int]) -> None:
+    """Precompute and persist all pattern databases of a board size, for every possible empty piece."""
+    for blank in range(dim[0] * dim[1]):
+        pattern_databases(dim, blank, build=True)
+
+
+class Heuristic:
+    """Lower bound of the moves needed to solve a board.
+
+    Uses the sum of the pattern databases if there are any, they already include the Manhattan distance of every
+    piece. On square boards the databases are also looked up for the board mirrored along its diagonal, which needs
+    as many moves, and the larger sum is used. Without databases the Manhattan distance plus linear conflicts.
+    """
+
+    def __init__(self, dim: Tuple[int, int], blank: int, databases: Sequence[PatternDatabase] = (),
+                 mirrored: Sequence[PatternDatabase] = ()) -> None:
+        """Initialize the heuristic.
+
+        :param dim: Number of (horizontal, vertical) pieces of the board
+        :param blank: The piece which is empty
+        :param databases: Additive pattern databases covering all other pieces
+        :param mirrored: Additive pattern databases covering all pieces except the mirrored empty one, see `mirror`
+        """
+        self.dim = dim
+        self.blank = blank
+        self.databases = list(databases)
+        self.mirrored = list(mirrored)
+        # database and weight of each piece
+        self.groups = {
+            piece: (group, database.weights[k])
+            for group, database in enumerate(self.databases)
+            for k, piece in enumerate(database.pieces)
+        }
+        # database and weight of each piece on the mirrored board, where it takes the place of its mirrored piece
+        self.mirrored_groups = {
+            mirror(dim)[piece]: (group, database.weights[k])
+            for group, database in enumerate(self.mirrored)
+            for k, piece in enumerate(database.pieces)
+        }
+
+    def row(self, tiles: Sequence[int], y: int) -> int:
+        """Linear conflicts of a row."""
+        horizontal = self.dim[0]
+        return line_conflicts([
+            piece % horizontal for piece in tiles[y * horizontal:(y + 1) * horizontal]
+            if piece != self.blank and piece // horizontal == y
+        ])
+
+    def column(self, tiles: Sequence[int], x: int) -> int:
+        """Linear conflicts of a column."""
+        horizontal = self.dim[0]
+        return line_conflicts([
+            piece // horizontal for piece in tiles[x::horizontal]
+            if piece != self.blank and piece % horizontal == x
+        ])
+
+    def indices(self, tiles: Sequence[int]) -> List[int]:
+        """Index of the current placement in every pattern database."""
+        indices = [0] * len(self.databases)
+        for position, piece in enumerate(tiles):
+            if piece in self.groups:
+                group, weight = self.groups[piece]
+                indices[group] += position * weight
+        return indices
+
+    def mirrored_indices(self, tiles: Sequence[int]) -> List[int]:
+        """Index of the placement of the mirrored board in every mirrored pattern database."""
+        indices = [0] * len(self.mirrored)
+        for position, piece in enumerate(tiles):
+            if piece in self.mirrored_groups:
+                group, weight = self.mirrored_groups[piece]
+                indices[group] += mirror(self.dim)[position] * weight
+        return indices
+
+    def estimate(self, tiles: Sequence[int]) -> int:
+        """Estimate the moves needed to solve a board, given the piece at every position."""
+        if self.databases:
+            patterns = sum(database.table[index] for database, index in zip(self.databases, self.indices(tiles)))
+            mirrored = sum(database.table[index]
+                           for database, index in zip(self.mirrored, self.mirrored_indices(tiles)))
+            return max(patterns, mirrored)
+        horizontal, vertical = self.dim
+        manhattan = sum(distance(position, piece, horizontal)
+                        for position, piece in enumerate(tiles) if piece != self.blank)
+        conflicts = (sum(self.row(tiles, y) for y in range(vertical))
+                     + sum(self.column(tiles, x) for x in range(horizontal)))
+        return manhattan + conflicts
+
+
+def ida_star(board: Board, heuristic: Heuristic, deadline: float,
+             cancel: Optional[threading.Event] = None) -> Optional[str]:
+    """Find a shortest solution with an iterative deepening A* search.
+
+    :raises Timeout: If the search is still running at `deadline` (a `time.perf_counter` value)
+    :raises Cancelled: If `cancel` is set while searching
+    :return: The moves of the empty piece, None if the board can not be solved
+    """
+    horizontal = board.dim[0]
+    tiles = list(board.tiles)
+    options = neighbours(board.dim)
+    blank = heuristic.blank
+    databases = [database.table for database in heuristic.databases]
+    groups = heuristic.groups
+    mirrored = [database.table for database in heuristic.mirrored]
+    mirrored_groups = heuristic.mirrored_groups
+    mirrored_position = mirror(board.dim) if mirrored else []
+
+    # heuristic components, updated incrementally with every move. The pattern databases are never below the
+    # Manhattan distance, the distances and line conflicts are only tracked without them.
+    lines = not databases
+    manhattan = sum(distance(position, piece, horizontal) for position, piece in enumerate(tiles) if piece != blank)
+    rows = [heuristic.row(tiles, y) for y in range(board.dim[1])]
+    columns = [heuristic.column(tiles, x) for x in range(horizontal)]
+    indices = heuristic.indices(tiles)
+    patterns = sum(table[index] for table, index in zip(databases, indices))
+    mirrored_indices = heuristic.mirrored_indices(tiles)
+    reflected = sum(table[index] for table, index in zip(mirrored, mirrored_indices))
+
+    path: List[str] = []
+    nodes = 0
+
+    def search(empty: int, cost: int, bound: int, previous: int) -> int:
+        nonlocal manhattan, patterns, reflected, nodes
+        nodes += 1
+        if nodes & 0xFFF == 0:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            if time.perf_counter() > deadline:
+                raise Timeout()
+
+        minimum = 1 << 30
+        for move, target in options[empty]:
+            if target == previous:
+                continue  # don't undo the last move
+            # move the piece at `target` into the empty position
+            piece = tiles[target]
+            tiles[empty], tiles[target] = piece, blank
+
+            if lines:
+                moved = distance(empty, piece, horizontal) - distance(target, piece, horizontal)
+                # only the conflicts of the two lines the piece moved between change
+                if empty // horizontal != target // horizontal:
+                    changed, a, b, conflicts = rows, empty // horizontal, target // horizontal, heuristic.row
+                else:
+                    changed, a, b, conflicts = columns, empty % horizontal, target % horizontal, heuristic.column
+                old = changed[a], changed[b]
+                changed[a], changed[b] = conflicts(tiles, a), conflicts(tiles, b)
+                manhattan += moved
+                estimate = manhattan + sum(rows) + sum(columns)
+            else:
+                group, weight = groups[piece]
+                shift = (empty - target) * weight
+                gained = databases[group][indices[group] + shift] - databases[group][indices[group]]
+                indices[group] += shift
+                patterns += gained
+                estimate = patterns
+                if mirrored:
+                    mirrored_group, mirrored_weight = mirrored_groups[piece]
+                    mirrored_shift = (mirrored_position[empty] - mirrored_position[target]) * mirrored_weight
+                    table, index = mirrored[mirrored_group], mirrored_indices[mirrored_group]
+                    mirrored_gained = table[index + mirrored_shift] - table[index]
+                    mirrored_indices[mirrored_group] += mirrored_shift
+                    reflected += mirrored_gained
+                    if reflected > patterns:
+                        estimate = reflected
+
+            # children beyond the bound are not searched, which saves a call for most of them
+            if cost + 1 + estimate > bound:
+                result = cost + 1 + estimate
+            elif estimate == 0:
+                path.append(move)
+                return -1
+            else:
+                path.append(move)
+                result = search(target, cost + 1, bound, empty)
+                if result == -1:
+                    return -1
+                path.pop()
+
+            if lines:
+                manhattan -= moved
+                changed[a], changed[b] = old
+            else:
+                patterns -= gained
+                indices[group] -= shift
+                if mirrored:
+                    reflected -= mirrored_gained
+                    mirrored_indices[mirrored_group] -= mirrored_shift
+            tiles[empty], tiles[target] = blank, piece
+            if result < minimum:
+                minimum = result
+        return minimum
+
+    bound = manhattan + sum(rows) + sum(columns) if lines else max(patterns, reflected)
+    if bound == 0:
+        return ''
+    while True:
+        result = search(board.empty, 0, bound, -1)
+        if result == -1:
+            return ''.join(path)
+        if result >= 1 << 30:
+            return None
+        bound = result
+
+
+def place(board: Board, goals: Dict[int, int], locked: Set[int], empty_goal: Optional[int] = None,
+          cancel: Optional[threading.Event] = None) -> str:
+    """Move some pieces to their goal positions with a weighted A* search, without touching locked positions.
+
+    Only the given pieces and the empty piece are tracked, the others are considered interchangeable.
+
+    :param goals: The goal position of every piece to place
+    :param locked: Positions the empty piece may not enter
+    :param empty_goal: Position the empty piece has to end at, if any
+    :param cancel: Stops the search with `Cancelled` once it is set
+    :return: The moves of the empty piece, they are also applied to the board
+    """
+    horizontal = board.dim[0]
+    options = neighbours(board.dim)
+    pieces = list(goals)
+    targets = [goals[piece] for piece in pieces]
+    start = (tuple(board.tiles.index(piece) for piece in pieces), board.empty)
+
+    def estimate(state: Tuple[Tuple[int, ...], int]) -> int:
+        positions, empty = state
+        remaining = [position for position, target in zip(positions, targets) if position != target]
+        estimate = GREEDY_WEIGHT * sum(distance(p, t, horizontal) for p, t in zip(positions, targets))
+        if remaining:
+            # the empty piece has to get next to a piece before moving it
+            estimate += min(distance(empty, position, horizontal) for position in remaining) - 1
+        if empty_goal is not None:
+            estimate += distance(empty, empty_goal, horizontal)
+        return estimate
+
+    parents: Dict[Tuple[Tuple[int, ...], int], Tuple[Optional[Tuple[Tuple[int, ...], int]], str]] = {start: (None, '')}
+    counter = itertools.count()
+    queue = [(estimate(start), next(counter), 0, start)]
+    while queue:
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        _, _, cost, state = heappop(queue)
+        positions, empty = state
+        if positions == tuple(targets) and empty_goal in (None, empty):
+            break
+
+        for move, target in options[empty]:
+            if target in locked:
+                continue
+            moved = tuple(empty if position == target else position for position in positions)
+            nxt = (moved, target)
+            if nxt not in parents:
+                parents[nxt] = (state, move)
+                heappush(queue, (cost + 1 + estimate(nxt), next(counter), cost + 1, nxt))
+    else:
+        raise ValueError('The pieces can not be placed')
+
+    moves = []
+    while parents[state][0] is not None:
+        state, move = parents[state]
+        moves.append(move)
+    moves.reverse()
+
+    for move in moves:
+        board.move(*MOVES[move])
+    return ''.join(moves)
+
+
+def reduce(board: Board, cancel: Optional[threading.Event] = None) -> str:
+    """Find a solution quickly by solving one outer row or column after another, until a small board is left.
+
+    :param cancel: Stops the search with `Cancelled` once it is set
+    :return: The moves of the empty piece, the solution is usually not the shortest
+    """
+    board = board.copy()
+    horizontal = board.dim[0]
+    blank = board.tiles[board.empty]
+    blank_x, blank_y = blank % horizontal, blank // horizontal
+    left, top, right, bottom = 0, 0, board.dim[0], board.dim[1]  # the unsolved part of the board
+    locked: Set[int] = set()
+    moves = []
+
+    while right - left > 3 or bottom - top > 3:
+        # solve the line on the side away from the goal position of the empty piece
+        if bottom - top >= right - left:
+            y = top if blank_y != top else bottom - 1
+            line = [y * horizontal + x for x in range(left, right)]
+            top, bottom = (top + 1, bottom) if y == top else (top, bottom - 1)
+        else:
+            x = left if blank_x != left else right - 1
+            line = [y * horizontal + x for y in range(top, bottom)]
+            left, right = (left + 1, right) if x == left else (left, right - 1)
+
+        # one piece after another, the last two together as they can not be placed on their own
+        for position in line[:-2]:
+            moves.append(place(board, {position: position}, locked, cancel=cancel))
+            locked.add(position)
+        moves.append(place(board, {position: position for position in line[-2:]}, locked, cancel=cancel))
+        locked.update(line[-2:])
+
+    rest = {position: position for position in range(len(board.tiles)) if position not in locked and position != blank}
+    moves.append(place(board, rest, locked, empty_goal=blank, cancel=cancel))
+    return ''.join(moves)
+
+
+class Solver:
+    """Solver finding the moves of the empty piece needed to solve a board."""
+
+    def __init__(self, timeout: float = 1.0, build: bool = False, cancel: Optional[threading.Event] = None) -> None:
+        """Initialize the solver.
+
+        :param timeout: Seconds to search for an optimal solution before falling back to a suboptimal one
+        :param build: Compute missing pattern databases, which takes a while for each of them
+        :param cancel: Event stopping a running search, for example once its result would not be shown anymore
+        """
+        self.timeout = timeout
+        self.build = build
+        self.cancel = cancel
+
+    def solve(self, board: Board) -> Solution:
+        """Solve a board, optimally if the board is small enough and the search finishes in time.
+
+        :raises ValueError: If the board can not be solved
+        :raises Cancelled: If the `cancel` event is set while searching
+        """
+        if not board.solvable:
+            raise ValueError('The puzzle can not be solved')
+        if board.solved:
+            return Solution('', True)
+
+        if len(board.tiles) <= OPTIMAL_LIMIT:
+            blank = board.tiles[board.empty]
+            databases = pattern_databases(board.dim, blank, self.build)
+            mirrored = []
+            if databases and board.dim[0] == board.dim[1]:
+                mirrored = pattern_databases(board.dim, mirror(board.dim)[blank], self.build)
+            heuristic = Heuristic(board.dim, blank, databases, mirrored)
+            try:
+                moves = ida_star(board, heuristic, time.perf_counter() + self.timeout, self.cancel)
+            except Timeout:
+                pass
+            else:
+                if moves is not None:
+                    return Solution(moves, True)
+
+        return Solution(reduce(board, self.cancel), False)
+
+
+if __name__ == '__main__':
+    # Precompute the pattern databases
+    for size in PATTERN_GROUPS:
+        start = time.perf_counter()
+        build_pattern_databases(size)
+        print(f'Built pattern databases for {size[0]}x{size[1]} in {time.perf_counter() - start:.1f} seconds')
@@ -1,4 +1,4 @@
-from typing import Any, List, Optional
+from typing import Any, Iterable, Iterator, List, Optional, TextIO
 
 VERTICAL = '│'
 HORIZONTAL = '─'
@@ -22,22 +22,53 @@ def make_table(rows: List[List[Any]], labels: Optional[List[Any]] = None, center
     :param centered: If the items should be aligned to the center, else they are left aligned.
     :return: A table representing the rows passed in.
     """
-    column_count = len(rows[0])
+    return '\n'.join(iter_table(rows, labels, centered))
 
-    temp_rows = rows.copy()
+
+def iter_table(rows: Iterable[Iterable[Any]], labels: Optional[Iterable[Any]] = None, centered: bool = False,
+               column_width: Optional[List[int]] = None) -> Iterator[str]:
+    """Creates a table line by line
+
+    Every cell is converted to a string once. Without `column_width` the rows are read in a single pass to measure
+    the columns before the first line is made, with it the rows are streamed and never held in memory.
+
+    :param rows: Iterable of rows containing objects that have a single-line representation (via `str`).
+    All rows must be of the same length.
+    :param labels: Column labels. If present, the length must equal to that of each row.
+    :param centered: If the items should be aligned to the center, else they are left aligned.
+    :param column_width: Width of each column, longer items are not cut off
+    :return: The lines of the table, without line endings
+    """
     if labels is not None:
-        temp_rows.append(labels)
-    column_width = get_column_size(column_count, temp_rows)
+        labels = [str(label) for label in labels]
+    rows = (list(map(str, row)) for row in rows)
+
+    if column_width is None:
+        rows = list(rows)
+        columns = list(zip(*rows, *([labels] if labels is not None else [])))
+        column_width = [max(len(item.strip()) for item in column) for column in columns]
 
-    table_string = make_top_border(column_width) + '\n'
+    yield make_top_border(column_width)
     if labels is not None:
-        table_string += make_row(column_count, column_width, centered, labels) + '\n'
-        table_string += make_separator(column_width) + '\n'
+        yield _make_row(column_width, centered, labels)
+        yield make_separator(column_width)
     for row in rows:
-        table_string += make_row(column_count, column_width, centered, row) + '\n'
-    table_string += make_bottom_border(column_width)
+        yield _make_row(column_width, centered, row)
+    yield make_bottom_border(column_width)
 
-    return table_string
+
+def write_table(file: TextIO, rows: Iterable[Iterable[Any]], labels: Optional[Iterable[Any]] = None,
+                centered: bool = False, column_width: Optional[List[int]] = None) -> None:
+    """Writes a table to a file line by line, see `iter_table`
+
+    :param file: File-like object to write to
+    :param rows: Iterable of rows, see `iter_table`
+    :param labels: Column labels, see `iter_table`
+    :param centered: If the items should be aligned to the center, else they are left aligned.
+    :param column_width: Width of each column, see `iter_table`
+    """
+    for line in iter_table(rows, labels, centered, column_width):
+        file.write(line + '\n')
 
 
 def get_column_size(column_count: int, rows: List) -> List:
@@ -131,3 +162,10 @@ def make_row(column_count: int, column_width: List, centered: bool, row: List) -
             my_string += f" {row[i]}{fill_count * ' '} {VERTICAL}"
 
     return my_string
+
+
+def _make_row(column_width: List[int], centered: bool, row: List[str]) -> str:
+    """Creates the string for one row of already converted items, see `make_row`"""
+    if centered:
+        row = [(width - len(item)) // 2 * ' ' + item for width, item in zip(column_width, row)]
+    return f'{VERTICAL} ' + f' {VERTICAL} '.join(map(str.ljust, row, column_width)) + f' {VERTICAL}'